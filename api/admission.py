@@ -0,0 +1,259 @@
+"""
+Admission control and load shedding.
+
+Every limited request takes a slot in its route class before it runs and
+gives it back once the response body is sent. Classes have their own
+concurrency limit and bounded wait queue, and all of them share one global
+limit. When a slot frees up, the waiting request with the highest priority
+(lowest number) whose class is under its limit goes next, so search and
+playback overtake ingest under load.
+
+Requests that can't be served promptly are shed instead of piling up:
+
+- 429 with Retry-After when the class's wait queue is already full
+- 503 with Retry-After when the request waited `admission_queue_timeout`
+
+Admitted responses carry `Server-Timing: queue;dur=<ms>`, and
+`AdmissionController.snapshot` (exposed in the admin stats) reports per-class
+counters and queue-wait totals for tuning. Limits apply per worker process.
+"""
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.config import settings
+
+# Path prefix -> route class; anything else (health, admin) is not limited
+ROUTE_CLASSES = (
+    ("/api/v1/search", "search"),
+    ("/api/v1/playback", "playback"),
+    ("/api/v1/upload", "ingest"),
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class _Lane:
+    """Limits and counters for one route class."""
+
+    def __init__(self, name: str, priority: int, limit: int, max_queue: Optional[int],
+                 queue_timeout: Optional[float]):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.max_queue = max_queue  # None: unbounded (background work is never shed)
+        self.queue_timeout = queue_timeout  # None: wait as long as it takes
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def record_wait(self, waited: float) -> None:
+        self.queued += 1
+        self.queue_wait_total += waited
+        self.queue_wait_max = max(self.queue_wait_max, waited)
+
+
+class AdmissionController:
+    """Per-process concurrency limits with priority-ordered, bounded wait queues."""
+
+    def __init__(self, max_concurrency: int, lanes: List[_Lane]):
+        self.max_concurrency = max_concurrency
+        self.lanes: Dict[str, _Lane] = {lane.name: lane for lane in lanes}
+        self.active = 0
+        self._waiters: list = []  # [priority, seq, lane, future]
+        self._seq = itertools.count()
+
+    async def acquire(self, name: str) -> float:
+        """Take a slot in the `name` class. Returns seconds spent queued.
+
+        Raises `AdmissionRejected` when the request is shed.
+        """
+        lane = self.lanes[name]
+        if self._has_room(lane) and not any(waiter[2] is lane for waiter in self._waiters):
+            self._admit(lane)
+            return 0.0
+
+        if lane.max_queue is not None and lane.waiting >= lane.max_queue:
+            lane.rejected_queue_full += 1
+            raise AdmissionRejected(429, f"Too many queued {name} requests")
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = [lane.priority, next(self._seq), lane, future]
+        self._waiters.append(waiter)
+        lane.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, lane.queue_timeout)
+        except asyncio.TimeoutError:
+            lane.rejected_timeout += 1
+            raise AdmissionRejected(503, f"Server busy; {name} request timed out in queue")
+        except asyncio.CancelledError:
+            # Client went away; hand back a slot granted in the meantime
+            if future.done() and not future.cancelled():
+                self.release(name)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                lane.waiting -= 1
+
+        waited = time.perf_counter() - started
+        lane.record_wait(waited)
+        return waited
+
+    def release(self, name: str) -> None:
+        """Give back a slot and wake the best eligible waiter."""
+        lane = self.lanes[name]
+        lane.active -= 1
+        self.active -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, name: str) -> AsyncIterator[float]:
+        """Hold a slot for the duration of the block; yields the queue wait."""
+        waited = await self.acquire(name)
+        try:
+            yield waited
+        finally:
+            self.release(name)
+
+    def snapshot(self) -> dict:
+        """Current load and counters per route class, for stats and tuning."""
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "classes": {
+                lane.name: {
+                    "priority": lane.priority,
+                    "limit": lane.limit,
+                    "max_queue": lane.max_queue,
+                    "active": lane.active,
+                    "waiting": lane.waiting,
+                    "admitted": lane.admitted,
+                    "queued": lane.queued,
+                    "rejected_queue_full": lane.rejected_queue_full,
+                    "rejected_timeout": lane.rejected_timeout,
+                    "queue_wait_avg_ms": round(lane.queue_wait_total / lane.queued * 1000, 2) if lane.queued else 0.0,
+                    "queue_wait_max_ms": round(lane.queue_wait_max * 1000, 2),
+                }
+                for lane in self.lanes.values()
+            },
+        }
+
+    def _has_room(self, lane: _Lane) -> bool:
+        return self.active < self.max_concurrency and lane.active < lane.limit
+
+    def _admit(self, lane: _Lane) -> None:
+        lane.active += 1
+        lane.admitted += 1
+        self.active += 1
+
+    def _wake(self) -> None:
+        while self.active < self.max_concurrency:
+            eligible = [
+                waiter for waiter in self._waiters
+                if not waiter[3].done() and waiter[2].active < waiter[2].limit
+            ]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: (w[0], w[1]))
+            self._waiters.remove(waiter)
+            waiter[2].waiting -= 1
+            self._admit(waiter[2])
+            waiter[3].set_result(None)
+
+
+@lru_cache(maxsize=None)
+def get_controller() -> AdmissionController:
+    """Return this process's admission controller, built from settings on first use."""
+    return AdmissionController(settings.admission_max_concurrency, [
+        _Lane("search", 0, settings.search_max_concurrency, settings.search_max_queue,
+              settings.admission_queue_timeout),
+        _Lane("playback", 0, settings.playback_max_concurrency, settings.playback_max_queue,
+              settings.admission_queue_timeout),
+        _Lane("ingest", 1, settings.ingest_max_concurrency, settings.ingest_max_queue,
+              settings.admission_queue_timeout),
+        # Background transcription queues behind requests and is never shed
+        _Lane("transcription", 2, settings.transcription_max_concurrency, None, None),
+    ])
+
+
+def classify(path: str) -> Optional[str]:
+    """Return the route class limiting `path`, or None if it is not limited."""
+    for prefix, name in ROUTE_CLASSES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return name
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying `AdmissionController` limits to API routes.
+
+    Pure ASGI rather than BaseHTTPMiddleware so streamed responses pass
+    through untouched. The slot is released as soon as the last body chunk
+    is sent; background tasks that run afterwards take their own slots.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        name = classify(scope["path"]) if scope["type"] == "http" else None
+        if name is None or not settings.admission_enabled or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        controller = get_controller()
+        try:
+            waited = await controller.acquire(name)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                {"detail": e.detail},
+                status_code=e.status_code,
+                headers={"Retry-After": str(settings.admission_retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                controller.release(name)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", f"queue;dur={waited * 1000:.1f}".encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+            if message["type"] == "http.response.pathsend" or (
+                message["type"] in ("http.response.body", "http.response.zerocopysend")
+                and not message.get("more_body", False)
+            ):
+                release()
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            release()
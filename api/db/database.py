@@ -1,12 +1,14 @@
-from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Text
+from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Text, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
 from api.config import settings
 from datetime import datetime
 
 # Create database engine
 engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: committed objects stay readable without a reload SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 # Database Models
@@ -17,6 +19,9 @@ class AudioFile(Base):
     filename = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
     duration = Column(Float)
+    sample_rate = Column(Integer)
+    channels = Column(Integer)
+    bitrate = Column(Integer)
     format = Column(String, nullable=False)
     upload_time = Column(DateTime, default=datetime.utcnow)
     transcription_status = Column(String, default="pending")
@@ -24,6 +29,10 @@ class AudioFile(Base):
 
 class Transcript(Base):
     __tablename__ = "transcripts"
+    __table_args__ = (
+        # Time-windowed transcript reads and keyset pagination
+        Index("ix_transcripts_file_id_start_time", "file_id", "start_time"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     file_id = Column(String, index=True, nullable=False)
@@ -32,6 +41,8 @@ class Transcript(Base):
     end_time = Column(Float, nullable=False)
     text = Column(Text, nullable=False)
     confidence_score = Column(Float)
+    term_offsets = Column(Text)  # JSON {term: [start, length, ...]}, see api.search.analysis
+    word_timings = Column(LargeBinary)  # Per-token start/duration columns, see api.search.timings
     created_at = Column(DateTime, default=datetime.utcnow)
 
 # Dependency to get database session
@@ -42,6 +53,23 @@ def get_db():
     finally:
         db.close()
 
+# Context-managed session for work shared across several service calls
+session_scope = contextmanager(get_db)
+
+# Transactional scope for a request or background job: commit on success,
+# roll back on error, always release the connection
+@contextmanager
+def unit_of_work():
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 # Create tables
 def create_tables():
     Base.metadata.create_all(bind=engine)
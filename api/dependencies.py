@@ -0,0 +1,46 @@
+"""
+Service providers for FastAPI dependency injection.
+
+Services are built on first use in each process instead of at import time,
+so importing the app stays cheap (CLI tools, worker preload) and nothing
+touches the filesystem until warmup or a request needs it. Each provider
+returns one shared instance per process.
+"""
+from functools import lru_cache
+
+from api.services.admin_service import AdminService
+from api.services.index_service import IndexService
+from api.services.playback_service import PlaybackService
+from api.services.search_service import SearchService
+from api.services.upload_service import UploadService
+from api.services.upload_session_service import UploadSessionService
+
+
+@lru_cache(maxsize=None)
+def get_upload_service() -> UploadService:
+    return UploadService()
+
+
+@lru_cache(maxsize=None)
+def get_upload_session_service() -> UploadSessionService:
+    return UploadSessionService()
+
+
+@lru_cache(maxsize=None)
+def get_search_service() -> SearchService:
+    return SearchService()
+
+
+@lru_cache(maxsize=None)
+def get_playback_service() -> PlaybackService:
+    return PlaybackService()
+
+
+@lru_cache(maxsize=None)
+def get_admin_service() -> AdminService:
+    return AdminService()
+
+
+@lru_cache(maxsize=None)
+def get_index_service() -> IndexService:
+    return IndexService()
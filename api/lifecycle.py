@@ -0,0 +1,79 @@
+"""
+Process lifecycle hooks shared by single-process and multi-worker serving.
+
+- `after_fork` runs in each worker right after it is forked from the
+  preloaded parent and drops state that must not be shared across processes.
+- `warmup` runs during application startup, before the worker accepts
+  traffic. Components register extra warmup steps with `register_warmup`.
+- `shutdown` runs when the worker stops, after in-flight requests finished.
+  Components register cleanup steps with `register_shutdown`.
+"""
+import asyncio
+import inspect
+import os
+from typing import Awaitable, Callable, List, Union
+
+from sqlalchemy import text
+
+from api.config import settings
+from api.db.database import engine
+from api.processing import executor
+from api.search import shards
+
+LifecycleHook = Callable[[], Union[None, Awaitable[None]]]
+
+_warmup_hooks: List[LifecycleHook] = []
+_shutdown_hooks: List[LifecycleHook] = []
+
+
+def register_warmup(hook: LifecycleHook) -> LifecycleHook:
+    """Register a sync or async callable to run at worker startup."""
+    _warmup_hooks.append(hook)
+    return hook
+
+
+def register_shutdown(hook: LifecycleHook) -> LifecycleHook:
+    """Register a sync or async callable to run at worker shutdown."""
+    _shutdown_hooks.append(hook)
+    return hook
+
+
+def after_fork() -> None:
+    """Reset per-process resources inherited from the preloaded parent."""
+    # Pooled connections must never be shared between processes
+    engine.dispose(close=False)
+    executor.reset_after_fork()
+    shards.reset_after_fork()
+
+
+async def warmup() -> None:
+    """Prepare this process to serve: storage, a pooled DB connection, caches."""
+    os.makedirs(settings.local_storage_path, exist_ok=True)
+
+    try:
+        await asyncio.to_thread(_open_pooled_connection)
+    except Exception as e:
+        # Serve anyway; requests report DB errors as they do today
+        print(f"Warmup: database not reachable: {e}")
+
+    await _run_hooks(_warmup_hooks)
+
+
+async def shutdown() -> None:
+    """Release per-process resources once in-flight work has finished."""
+    await _run_hooks(_shutdown_hooks)
+    # Waits for queued compaction/waveform jobs to finish
+    await asyncio.to_thread(executor.shutdown_executor)
+    engine.dispose()
+
+
+async def _run_hooks(hooks: List[LifecycleHook]) -> None:
+    for hook in hooks:
+        result = hook()
+        if inspect.isawaitable(result):
+            await result
+
+
+def _open_pooled_connection() -> None:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
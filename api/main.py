@@ -2,6 +2,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.routers import upload, search, playback, admin
 from api.config import settings
+from api import lifecycle
+from api.admission import AdmissionMiddleware
+from api.dependencies import get_index_service
+from api.search.shards import get_shard_pool, shutdown_shard_pool
 
 app = FastAPI(
     title="EchoFind API",
@@ -9,6 +13,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Shed excess load before it queues up in the event loop; CORS stays
+# outermost so rejections still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +32,23 @@ app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
 app.include_router(playback.router, prefix="/api/v1/playback", tags=["playback"])
 app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
 
+# Load in-memory search indexes before the worker takes traffic
+lifecycle.register_warmup(lambda: get_index_service().start())
+lifecycle.register_shutdown(lambda: get_index_service().stop())
+
+# Spawn the shard search processes once the index is current
+if settings.search_shards > 1:
+    lifecycle.register_warmup(lambda: get_shard_pool().start())
+    lifecycle.register_shutdown(shutdown_shard_pool)
+
+@app.on_event("startup")
+async def startup():
+    await lifecycle.warmup()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await lifecycle.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "EchoFind API is running", "version": "1.0.0"}
@@ -1,13 +1,22 @@
-from .upload import UploadResponse, AudioFile
-from .search import SearchRequest, SearchResponse, SearchResult
+from .upload import UploadResponse, AudioFile, UploadSessionRequest, UploadSessionResponse
+from .search import (
+    SearchRequest, SearchResponse, SearchResult, BatchSearchRequest, BatchSearchResponse,
+    Suggestion, SuggestResponse
+)
 from .playback import PlaybackRequest, PlaybackResponse
 
 __all__ = [
     "UploadResponse",
     "AudioFile", 
+    "UploadSessionRequest",
+    "UploadSessionResponse",
     "SearchRequest",
     "SearchResponse",
     "SearchResult",
+    "BatchSearchRequest",
+    "BatchSearchResponse",
+    "Suggestion",
+    "SuggestResponse",
     "PlaybackRequest",
     "PlaybackResponse"
 ]
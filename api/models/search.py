@@ -1,21 +1,26 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
 class SearchRequest(BaseModel):
-    query: str
+    query: str  # Substring match, or "exact phrase" / "terms near each other"~N
     limit: int = 10
     offset: int = 0
     file_ids: Optional[List[str]] = None
     date_from: Optional[datetime] = None
     date_to: Optional[datetime] = None
+    snippet_chars: int = 160  # 0 returns the whole segment text
 
 class SearchResult(BaseModel):
     file_id: str
     filename: str
-    transcript_segment: str
+    transcript_segment: str  # Snippet around the best match, see snippet_offset
+    snippet_offset: int = 0
+    highlights: List[List[int]] = []  # [start, end) character spans in transcript_segment
     start_time: float
     end_time: float
+    match_start_time: Optional[float] = None  # When the matched words are spoken; seek here
+    match_end_time: Optional[float] = None
     confidence_score: float
     upload_time: datetime
 
@@ -25,3 +30,21 @@ class SearchResponse(BaseModel):
     total_count: int
     query: str
     took_ms: int
+
+class BatchSearchRequest(BaseModel):
+    requests: List[SearchRequest] = Field(..., min_length=1, max_length=100)
+
+class BatchSearchResponse(BaseModel):
+    success: bool
+    responses: List[SearchResponse]  # One per request, in request order
+    unique_queries: int
+    took_ms: int
+
+class Suggestion(BaseModel):
+    text: str  # A term or a two-word phrase
+    weight: int  # Number of transcript segments containing it
+
+class SuggestResponse(BaseModel):
+    prefix: str
+    suggestions: List[Suggestion]
+    took_ms: float
@@ -1,12 +1,15 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class AudioFile(BaseModel):
     id: str
     filename: str
     file_size: int
     duration: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    bitrate: Optional[int] = None
     format: str
     upload_time: datetime
     transcription_status: str = "pending"  # pending, processing, completed, failed
@@ -16,3 +19,18 @@ class UploadResponse(BaseModel):
     message: str
     file_id: Optional[str] = None
     audio_file: Optional[AudioFile] = None
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    file_size: int
+    part_size: Optional[int] = None  # Defaults to settings.upload_part_size
+
+class UploadSessionResponse(BaseModel):
+    session_id: str
+    filename: str
+    file_size: int
+    part_size: int
+    total_parts: int
+    received_parts: List[int] = []
+    missing_parts: List[int] = []
+    expires_at: datetime
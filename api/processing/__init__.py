@@ -0,0 +1 @@
+# Audio processing modules
@@ -0,0 +1,89 @@
+"""
+Pre-transcription audio compaction.
+
+Whisper only needs 16kHz mono audio, so we convert uploads into a compact
+artifact before sending them to the API. The conversion is CPU bound and
+runs in the shared processing pool, off the event loop:
+
+- PCM WAV is downmixed and resampled with NumPy and written as 16-bit WAV.
+- Everything else is transcoded to 16kHz mono Opus with ffmpeg, when present.
+
+Artifacts are stored next to the original as `{file_id}.16k.{ext}` and
+reused on re-runs.
+"""
+import os
+import shutil
+import subprocess
+import wave
+from typing import Optional
+
+from api.config import settings
+from api.processing import decoding
+
+TARGET_SAMPLE_RATE = 16000
+ARTIFACT_SUFFIX = ".16k"
+
+
+def artifact_prefix(file_id: str) -> str:
+    """Storage key prefix shared by every compaction artifact of a file."""
+    return f"{file_id}{ARTIFACT_SUFFIX}."
+
+
+def compact_audio(source_path: str, dest_stem: str) -> Optional[str]:
+    """Convert `source_path` into a 16kHz mono artifact at `dest_stem`.*.
+
+    Runs inside a worker process. Returns the artifact path, or None when the
+    input can't be converted here or the result would not be smaller than the
+    original (the caller then transcribes the original bytes).
+    """
+    artifact = None
+    if source_path.lower().endswith(".wav"):
+        artifact = _compact_wav(source_path, dest_stem + ARTIFACT_SUFFIX + ".wav")
+    if artifact is None and shutil.which("ffmpeg"):
+        artifact = _compact_ffmpeg(source_path, dest_stem + ARTIFACT_SUFFIX + ".ogg")
+    if artifact is None:
+        return None
+
+    if os.path.getsize(artifact) >= os.path.getsize(source_path):
+        os.remove(artifact)
+        return None
+    return artifact
+
+
+def _compact_wav(source_path: str, dest_path: str) -> Optional[str]:
+    """Downmix and resample a PCM WAV with NumPy, writing 16-bit mono WAV."""
+    import numpy as np
+
+    decoded = decoding.read_wav_mono(np, source_path)
+    if decoded is None:
+        # Not plain PCM; let ffmpeg try
+        return None
+
+    sample_rate, mono = decoded
+    resampled = decoding.resample(np, mono, sample_rate, TARGET_SAMPLE_RATE)
+    pcm = (np.clip(resampled, -1.0, 1.0) * 32767.0).astype("<i2")
+
+    with wave.open(dest_path, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(TARGET_SAMPLE_RATE)
+        writer.writeframes(pcm.tobytes())
+    return dest_path
+
+
+def _compact_ffmpeg(source_path: str, dest_path: str) -> Optional[str]:
+    """Transcode any ffmpeg-readable input to 16kHz mono Opus."""
+    command = [
+        "ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+        "-i", source_path,
+        "-vn", "-ac", "1", "-ar", str(TARGET_SAMPLE_RATE),
+        "-c:a", "libopus", "-b:a", settings.compaction_opus_bitrate,
+        dest_path,
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=600)
+    except (OSError, subprocess.SubprocessError):
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        return None
+    return dest_path
@@ -0,0 +1,118 @@
+"""
+PCM decoding helpers shared by the ingest stages.
+
+NumPy is passed in by callers (imported inside the worker process) so that
+importing this module stays cheap for the API process.
+"""
+import shutil
+import subprocess
+import wave
+from typing import Iterator, Optional, Tuple
+
+FFMPEG_SAMPLE_RATE = 16000
+
+
+def pcm_to_float(np, frames: bytes, sample_width: int):
+    """Decode interleaved little-endian PCM into float32 in [-1, 1]."""
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        return (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8)
+        raw = raw[: len(raw) - len(raw) % 3].reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values = (values << 8) >> 8  # sign-extend from 24 bits
+        return values.astype(np.float32) / 8388608.0
+    if sample_width == 4:
+        return np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    raise ValueError(f"Unsupported PCM sample width: {sample_width}")
+
+
+def downmix(np, samples, channels: int):
+    """Average interleaved channels into a mono float32 array."""
+    if channels == 1:
+        return samples
+    samples = samples[: len(samples) - len(samples) % channels]
+    return samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+
+def resample(np, samples, src_rate: int, dst_rate: int):
+    """Resample with a windowed-sinc anti-alias filter and linear interpolation."""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples.astype(np.float32)
+
+    if dst_rate < src_rate:
+        # Low-pass just below the new Nyquist frequency before decimating
+        cutoff = 0.45 * dst_rate / src_rate
+        taps = np.arange(-32, 33, dtype=np.float32)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        samples = np.convolve(samples, kernel / kernel.sum(), mode="same")
+
+    out_length = int(len(samples) * dst_rate // src_rate)
+    positions = np.arange(out_length, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def read_wav_mono(np, path: str) -> Optional[Tuple[int, object]]:
+    """Read a whole PCM WAV as (sample_rate, mono float32), or None if not PCM."""
+    try:
+        with wave.open(path, "rb") as reader:
+            channels = reader.getnchannels()
+            sample_width = reader.getsampwidth()
+            sample_rate = reader.getframerate()
+            frames = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError):
+        # Not plain PCM (e.g. IEEE float or compressed WAV)
+        return None
+    return sample_rate, downmix(np, pcm_to_float(np, frames, sample_width), channels)
+
+
+def open_mono_stream(np, path: str, block_frames: int = 1 << 18) -> Optional[Tuple[int, Iterator]]:
+    """Decode `path` incrementally into mono float32 blocks.
+
+    PCM WAV is read at its native rate; anything else is decoded by ffmpeg at
+    16kHz. Returns (sample_rate, blocks) or None when neither applies.
+    """
+    if path.lower().endswith(".wav"):
+        try:
+            reader = wave.open(path, "rb")
+        except (wave.Error, EOFError):
+            reader = None
+        if reader is not None:
+            return reader.getframerate(), _wav_blocks(np, reader, block_frames)
+
+    if shutil.which("ffmpeg"):
+        return FFMPEG_SAMPLE_RATE, _ffmpeg_blocks(np, path, block_frames)
+    return None
+
+
+def _wav_blocks(np, reader, block_frames: int) -> Iterator:
+    with reader:
+        channels = reader.getnchannels()
+        sample_width = reader.getsampwidth()
+        while True:
+            frames = reader.readframes(block_frames)
+            if not frames:
+                break
+            yield downmix(np, pcm_to_float(np, frames, sample_width), channels)
+
+
+def _ffmpeg_blocks(np, path: str, block_frames: int) -> Iterator:
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", path,
+        "-vn", "-ac", "1", "-ar", str(FFMPEG_SAMPLE_RATE),
+        "-f", "f32le", "pipe:1",
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            data = process.stdout.read(block_frames * 4)
+            if not data:
+                break
+            yield np.frombuffer(data[: len(data) - len(data) % 4], dtype="<f4")
+    finally:
+        process.stdout.close()
+        process.wait()
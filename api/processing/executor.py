@@ -0,0 +1,36 @@
+"""
+Shared process pool for CPU-bound ingest work (compaction, waveforms).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Optional
+
+from api.config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared processing pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        # spawn: forking a threaded server process is not safe
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.processing_workers,
+            mp_context=get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Shut down the processing pool, if it was started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def reset_after_fork() -> None:
+    """Forget a pool inherited from the parent; the child creates its own on first use."""
+    global _executor
+    _executor = None
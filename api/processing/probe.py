@@ -0,0 +1,304 @@
+"""
+Header-only media metadata probe.
+
+Reads duration, sample rate, channels and bitrate from container and codec
+headers without decoding any audio. Only a few small reads are issued per
+file (the leading headers, plus the tail for MP3 ID3v1 and Ogg granule
+positions, or box headers for MP4), so probing is cheap enough to run
+inline at upload time.
+
+Supported: MP3 (Xing/Info, VBRI, CBR), WAV, FLAC STREAMINFO, Ogg
+(Vorbis, Opus, FLAC) and MP4/M4A `mvhd`.
+"""
+import os
+import struct
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Tuple
+
+HEAD_BYTES = 8 * 1024
+TAIL_BYTES = 64 * 1024
+
+
+class MediaInfo(NamedTuple):
+    duration: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    bitrate: Optional[int] = None  # bits per second
+
+
+def probe_media(path: str, format: Optional[str] = None) -> MediaInfo:
+    """Probe a media file's headers. Returns an empty MediaInfo when unknown."""
+    format = (format or os.path.splitext(path)[1].lstrip(".")).lower()
+    try:
+        with open(path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            head = f.read(HEAD_BYTES)
+            if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+                return _probe_wav(f, file_size)
+            if head.startswith(b"OggS"):
+                return _probe_ogg(f, head, file_size)
+            if head[4:8] == b"ftyp" or format in ("mp4", "m4a"):
+                return _probe_mp4(f, file_size)
+
+            audio_start = _id3v2_size(head)
+            if audio_start:
+                f.seek(audio_start)
+                head = f.read(HEAD_BYTES)
+            if head.startswith(b"fLaC"):
+                return _probe_flac(head, file_size)
+            if format == "mp3":
+                return _probe_mp3(f, head, audio_start, file_size)
+    except (OSError, struct.error, ValueError, ZeroDivisionError):
+        pass
+    return MediaInfo()
+
+
+def _with_bitrate(info: MediaInfo, payload_bytes: int) -> MediaInfo:
+    """Fill in an average bitrate from the payload size when it is missing."""
+    if info.bitrate is None and info.duration:
+        return info._replace(bitrate=int(payload_bytes * 8 / info.duration))
+    return info
+
+
+# WAV
+
+def _probe_wav(f: BinaryIO, file_size: int) -> MediaInfo:
+    offset = 12
+    channels = sample_rate = byte_rate = None
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+        if chunk_id == b"fmt ":
+            _, channels, sample_rate, byte_rate = struct.unpack("<HHII", f.read(12))
+        elif chunk_id == b"data":
+            # Streaming writers leave 0 or 0xFFFFFFFF here; trust the file size
+            data_size = min(chunk_size, file_size - offset - 8) or file_size - offset - 8
+            if not byte_rate:
+                break
+            return MediaInfo(
+                duration=data_size / byte_rate,
+                sample_rate=sample_rate,
+                channels=channels,
+                bitrate=byte_rate * 8,
+            )
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return MediaInfo(sample_rate=sample_rate, channels=channels,
+                     bitrate=byte_rate * 8 if byte_rate else None)
+
+
+# FLAC
+
+def _parse_streaminfo(block: bytes) -> Tuple[int, int, int]:
+    """Return (sample_rate, channels, total_samples) from a STREAMINFO body."""
+    packed = int.from_bytes(block[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    return sample_rate, channels, total_samples
+
+
+def _probe_flac(head: bytes, file_size: int) -> MediaInfo:
+    # STREAMINFO is always the first metadata block: 4-byte header + 34 bytes
+    sample_rate, channels, total_samples = _parse_streaminfo(head[8:42])
+    duration = total_samples / sample_rate if total_samples and sample_rate else None
+    info = MediaInfo(duration=duration, sample_rate=sample_rate, channels=channels)
+    return _with_bitrate(info, file_size)
+
+
+# Ogg
+
+def _probe_ogg(f: BinaryIO, head: bytes, file_size: int) -> MediaInfo:
+    segment_count = head[26]
+    packet = head[27 + segment_count:]
+
+    if packet.startswith(b"\x01vorbis"):
+        channels, sample_rate, _, nominal = struct.unpack_from("<BIiI", packet, 11)
+        granule_rate, pre_skip = sample_rate, 0
+        bitrate = nominal if 0 < nominal < 0x7FFFFFFF else None
+    elif packet.startswith(b"OpusHead"):
+        channels, pre_skip, sample_rate = struct.unpack_from("<BHI", packet, 9)
+        granule_rate, bitrate = 48000, None  # Opus granules always count 48kHz samples
+    elif packet.startswith(b"\x7fFLAC"):
+        sample_rate, channels, _ = _parse_streaminfo(packet[17:51])
+        granule_rate, pre_skip, bitrate = sample_rate, 0, None
+    else:
+        return MediaInfo()
+
+    f.seek(max(file_size - TAIL_BYTES, 0))
+    tail = f.read(TAIL_BYTES)
+    last_page = tail.rfind(b"OggS")
+    duration = None
+    if last_page != -1 and last_page + 14 <= len(tail) and granule_rate:
+        granule = struct.unpack_from("<q", tail, last_page + 6)[0]
+        if granule > pre_skip:
+            duration = (granule - pre_skip) / granule_rate
+
+    info = MediaInfo(duration=duration, sample_rate=sample_rate or None,
+                     channels=channels, bitrate=bitrate)
+    return _with_bitrate(info, file_size)
+
+
+# MP4 / M4A
+
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+_MP4_AUDIO_ENTRIES = {b"mp4a", b"alac", b"Opus", b"fLaC", b"ac-3", b"ec-3"}
+
+
+def _iter_boxes(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload_start, box_end) for the boxes in [start, end)."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _probe_mp4(f: BinaryIO, file_size: int) -> MediaInfo:
+    duration = sample_rate = channels = None
+
+    def walk(start: int, end: int) -> None:
+        nonlocal duration, sample_rate, channels
+        for box_type, payload, box_end in _iter_boxes(f, start, end):
+            if box_type == b"mvhd":
+                f.seek(payload)
+                version = f.read(4)[0]
+                if version == 1:
+                    timescale, length = struct.unpack(">16xIQ", f.read(28))
+                else:
+                    timescale, length = struct.unpack(">8xII", f.read(16))
+                if timescale:
+                    duration = length / timescale
+            elif box_type == b"stsd" and sample_rate is None:
+                # Full box header (4) + entry count (4), then the first sample entry
+                f.seek(payload + 8)
+                entry = f.read(36)
+                if len(entry) == 36 and entry[4:8] in _MP4_AUDIO_ENTRIES:
+                    channels, = struct.unpack_from(">H", entry, 24)
+                    sample_rate = struct.unpack_from(">I", entry, 32)[0] >> 16
+            elif box_type in _MP4_CONTAINERS:
+                walk(payload, box_end)
+
+    walk(0, file_size)
+    info = MediaInfo(duration=duration, sample_rate=sample_rate, channels=channels)
+    return _with_bitrate(info, file_size)
+
+
+# MP3
+
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {
+    1: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    25: (11025, 12000, 8000),
+}
+
+
+def _id3v2_size(head: bytes) -> int:
+    """Return the total size of a leading ID3v2 tag, or 0."""
+    if len(head) < 10 or not head.startswith(b"ID3"):
+        return 0
+    size = 0
+    for byte in head[6:10]:
+        size = (size << 7) | (byte & 0x7F)  # syncsafe integer
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_mp3_header(data: bytes, offset: int) -> Optional[dict]:
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version = {0: 25, 2: 2, 3: 1}.get((b1 >> 3) & 0x3)
+    layer = {1: 3, 2: 2, 3: 1}.get((b1 >> 1) & 0x3)
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 0x3
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x1
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples_per_frame = 1152 if layer == 2 or version == 1 else 576
+        frame_length = samples_per_frame // 8 * bitrate // sample_rate + padding
+    return {
+        "version": version,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": 1 if b3 >> 6 == 3 else 2,
+        "samples_per_frame": samples_per_frame,
+        "frame_length": frame_length,
+    }
+
+
+def _find_mp3_frame(data: bytes) -> Optional[Tuple[int, dict]]:
+    """Find the first frame header, confirmed by the frame that follows it."""
+    offset = data.find(b"\xff")
+    while offset != -1:
+        header = _parse_mp3_header(data, offset)
+        if header:
+            following = offset + header["frame_length"]
+            if following + 4 > len(data) or _parse_mp3_header(data, following):
+                return offset, header
+        offset = data.find(b"\xff", offset + 1)
+    return None
+
+
+def _probe_mp3(f: BinaryIO, head: bytes, audio_start: int, file_size: int) -> MediaInfo:
+    found = _find_mp3_frame(head)
+    if found is None:
+        return MediaInfo()
+    offset, header = found
+    sample_rate, channels = header["sample_rate"], header["channels"]
+
+    audio_end = file_size
+    if file_size >= 128:
+        f.seek(file_size - 128)
+        if f.read(3) == b"TAG":
+            audio_end -= 128  # ID3v1 tag
+    audio_bytes = audio_end - audio_start - offset
+
+    frames = vbr_bytes = None
+    if header["version"] == 1:
+        side_info = 17 if channels == 1 else 32
+    else:
+        side_info = 9 if channels == 1 else 17
+    xing = offset + 4 + side_info
+    vbri = offset + 4 + 32
+    if head[xing:xing + 4] in (b"Xing", b"Info"):
+        flags, = struct.unpack_from(">I", head, xing + 4)
+        cursor = xing + 8
+        if flags & 0x1:
+            frames, = struct.unpack_from(">I", head, cursor)
+            cursor += 4
+        if flags & 0x2:
+            vbr_bytes, = struct.unpack_from(">I", head, cursor)
+    elif head[vbri:vbri + 4] == b"VBRI":
+        vbr_bytes, frames = struct.unpack_from(">II", head, vbri + 10)
+
+    if frames:
+        duration = frames * header["samples_per_frame"] / sample_rate
+        bitrate = int((vbr_bytes or audio_bytes) * 8 / duration)
+    else:
+        # Constant bitrate: the first frame's bitrate holds for the whole stream
+        bitrate = header["bitrate"]
+        duration = audio_bytes * 8 / bitrate
+    return MediaInfo(duration=duration, sample_rate=sample_rate, channels=channels, bitrate=bitrate)
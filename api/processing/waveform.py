@@ -0,0 +1,145 @@
+"""
+Precomputed waveform peaks.
+
+At ingest we decode the media once and store min/max/RMS envelopes at a few
+zoom levels, so players can draw a waveform from a few KB instead of
+downloading the whole file. The `.peaks` file is little-endian:
+
+    header   "<4sHHI"  magic b"EFWP", version, level_count, sample_rate
+    levels   "<IIQ"    samples_per_bucket, bucket_count, data_offset  (x level_count)
+    data     int8[bucket_count, 3]  (min, max, rms) scaled to [-127, 127]
+
+Level 0 is the finest (~100 buckets per second); coarser levels aggregate it.
+"""
+import os
+import struct
+from typing import List, NamedTuple, Optional
+
+from api.processing import decoding
+
+MAGIC = b"EFWP"
+VERSION = 1
+PEAKS_SUFFIX = ".peaks"
+FINEST_BUCKETS_PER_SECOND = 100
+LEVEL_FACTORS = (1, 4, 20, 100)  # ~100, 25, 5 and 1 buckets per second
+BYTES_PER_BUCKET = 3
+
+_HEADER = struct.Struct("<4sHHI")
+_LEVEL = struct.Struct("<IIQ")
+
+
+class WaveformLevel(NamedTuple):
+    samples_per_bucket: int
+    bucket_count: int
+    data_offset: int
+
+
+class WaveformHeader(NamedTuple):
+    sample_rate: int
+    levels: List[WaveformLevel]
+
+
+def peaks_key(file_id: str) -> str:
+    """Return the storage key of the peaks file for a media file."""
+    return f"{file_id}{PEAKS_SUFFIX}"
+
+
+def build_waveform(source_path: str, dest_path: str) -> Optional[str]:
+    """Decode `source_path` and write its peaks file to `dest_path`.
+
+    Runs inside a worker process. Returns `dest_path`, or None when the media
+    can't be decoded here (non-PCM input without ffmpeg).
+    """
+    import numpy as np
+
+    stream = decoding.open_mono_stream(np, source_path)
+    if stream is None:
+        return None
+    sample_rate, blocks = stream
+    samples_per_bucket = max(1, sample_rate // FINEST_BUCKETS_PER_SECOND)
+
+    # Finest level, accumulated block by block so memory stays bounded
+    mins, maxs, sumsq, counts = [], [], [], []
+    carry = np.empty(0, dtype=np.float32)
+    for block in blocks:
+        if len(carry):
+            block = np.concatenate([carry, block])
+        usable = len(block) - len(block) % samples_per_bucket
+        carry = block[usable:]
+        if usable:
+            _accumulate(np, block[:usable].reshape(-1, samples_per_bucket), mins, maxs, sumsq, counts)
+    if len(carry):
+        _accumulate(np, carry.reshape(1, -1), mins, maxs, sumsq, counts)
+
+    if mins:
+        mins, maxs = np.concatenate(mins), np.concatenate(maxs)
+        sumsq, counts = np.concatenate(sumsq), np.concatenate(counts)
+    else:
+        mins = maxs = np.empty(0, dtype=np.float32)
+        sumsq, counts = np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64)
+
+    level_data = []
+    for factor in LEVEL_FACTORS:
+        if factor == 1 or not len(mins):
+            level = (mins, maxs, sumsq, counts)
+        else:
+            starts = np.arange(0, len(mins), factor)
+            level = (
+                np.minimum.reduceat(mins, starts),
+                np.maximum.reduceat(maxs, starts),
+                np.add.reduceat(sumsq, starts),
+                np.add.reduceat(counts, starts),
+            )
+        level_data.append((samples_per_bucket * factor, _quantize(np, *level)))
+
+    _write_peaks(dest_path, sample_rate, level_data)
+    return dest_path
+
+
+def _accumulate(np, frames, mins, maxs, sumsq, counts) -> None:
+    mins.append(frames.min(axis=1))
+    maxs.append(frames.max(axis=1))
+    sumsq.append(np.square(frames, dtype=np.float64).sum(axis=1))
+    counts.append(np.full(len(frames), frames.shape[1], dtype=np.int64))
+
+
+def _quantize(np, mins, maxs, sumsq, counts):
+    """Pack (min, max, rms) per bucket as interleaved int8."""
+    rms = np.sqrt(sumsq / np.maximum(counts, 1))
+    packed = np.stack([mins, maxs, rms], axis=1)
+    return np.clip(np.rint(packed * 127.0), -127, 127).astype(np.int8)
+
+
+def _write_peaks(dest_path: str, sample_rate: int, level_data: list) -> None:
+    offset = _HEADER.size + _LEVEL.size * len(level_data)
+    level_headers = []
+    for samples_per_bucket, packed in level_data:
+        level_headers.append(_LEVEL.pack(samples_per_bucket, len(packed), offset))
+        offset += packed.nbytes
+
+    # Write-then-rename so readers never see a partial file
+    tmp_path = dest_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(level_data), sample_rate))
+        for level_header in level_headers:
+            f.write(level_header)
+        for _, packed in level_data:
+            f.write(packed.tobytes())
+    os.replace(tmp_path, dest_path)
+
+
+def parse_header(data: bytes) -> WaveformHeader:
+    """Parse the header and level table from the start of a peaks file."""
+    magic, version, level_count, sample_rate = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unrecognised waveform peaks file")
+    levels = [
+        WaveformLevel(*_LEVEL.unpack_from(data, _HEADER.size + i * _LEVEL.size))
+        for i in range(level_count)
+    ]
+    return WaveformHeader(sample_rate=sample_rate, levels=levels)
+
+
+def header_size(level_count: int = len(LEVEL_FACTORS)) -> int:
+    """Number of bytes to read to parse the header of a peaks file."""
+    return _HEADER.size + _LEVEL.size * level_count
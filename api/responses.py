@@ -0,0 +1,180 @@
+import os
+import stat
+from typing import Optional, Tuple
+
+import anyio
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+from api.config import settings
+from api.storage import Storage, StoredObject
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header cannot be served for the file size."""
+
+
+def parse_range_header(range_header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into an inclusive (start, end) pair.
+
+    Returns None when the whole file should be served, which covers a missing
+    header, a non-byte unit and multi-range requests (we don't build
+    multipart/byteranges bodies; RFC 9110 allows ignoring Range).
+    """
+    if not range_header:
+        return None
+
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        raise RangeNotSatisfiable(range_header)
+
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(range_header)
+            start = max(file_size - suffix, 0)
+            end = file_size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else file_size - 1
+    except ValueError:
+        raise RangeNotSatisfiable(range_header)
+
+    if start < 0 or start >= file_size or end < start:
+        raise RangeNotSatisfiable(range_header)
+
+    return start, min(end, file_size - 1)
+
+
+class MediaFileResponse(FileResponse):
+    """FileResponse with byte-range support and zero-copy body sends.
+
+    When the ASGI server advertises `http.response.pathsend` (full file) or
+    `http.response.zerocopysend` (any range) the body is handed to the
+    server, which can use `os.sendfile` without copying through Python.
+    Otherwise the file is read in the threadpool with large buffers so disk
+    I/O never blocks the event loop.
+    """
+
+    def __init__(self, path: str, range_header: Optional[str] = None, **kwargs) -> None:
+        super().__init__(path, **kwargs)
+        self.range_header = range_header
+        self.chunk_size = settings.stream_chunk_size
+        self.zero_copy = settings.stream_zero_copy
+        self.headers.setdefault("accept-ranges", "bytes")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            try:
+                self.stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                raise RuntimeError(f"File at path {self.path} does not exist.")
+            if not stat.S_ISREG(self.stat_result.st_mode):
+                raise RuntimeError(f"File at path {self.path} is not a file.")
+            self.set_stat_headers(self.stat_result)
+
+        file_size = self.stat_result.st_size
+        try:
+            byte_range = parse_range_header(self.range_header, file_size)
+        except RangeNotSatisfiable:
+            await self._send_not_satisfiable(send, file_size)
+            return
+
+        if byte_range is None:
+            offset, count = 0, file_size
+        else:
+            offset, count = byte_range[0], byte_range[1] - byte_range[0] + 1
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{file_size}"
+            self.headers["content-length"] = str(count)
+
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        extensions = scope.get("extensions") or {}
+        if self.send_header_only or count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif self.zero_copy and byte_range is None and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        elif self.zero_copy and "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                })
+        else:
+            await self._send_buffered(send, offset, count)
+
+        if self.background is not None:
+            await self.background()
+
+    async def _send_buffered(self, send: Send, offset: int, count: int) -> None:
+        """Stream `count` bytes from `offset`, reading in the threadpool."""
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if offset:
+                await file.seek(offset)
+            remaining = count
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                # File shrank underneath us; close the body cleanly
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_not_satisfiable(self, send: Send, file_size: int) -> None:
+        headers = [
+            (b"content-range", f"bytes */{file_size}".encode("latin-1")),
+            (b"content-length", b"0"),
+        ]
+        await send({"type": "http.response.start", "status": 416, "headers": headers})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class StoredObjectResponse(MediaFileResponse):
+    """`MediaFileResponse` for an object with no local copy on this host.
+
+    The body, or the requested range of it, is streamed from storage with
+    ranged reads. Headers, range handling and HEAD match a local file.
+    """
+
+    def __init__(self, storage: Storage, stored: StoredObject, range_header: Optional[str] = None,
+                 **kwargs) -> None:
+        file_stat = os.stat_result((stat.S_IFREG | 0o644, 0, 0, 1, 0, 0, stored.size,
+                                    stored.mtime, stored.mtime, stored.mtime))
+        kwargs.setdefault("filename", stored.key)
+        super().__init__(stored.key, range_header=range_header, stat_result=file_stat, **kwargs)
+        self.storage = storage
+        self.zero_copy = False
+
+    async def _send_buffered(self, send: Send, offset: int, count: int) -> None:
+        """Stream `count` bytes from `offset` with one ranged read."""
+        remaining = count
+        async for chunk in self.storage.iter_range(self.path, offset, count, self.chunk_size):
+            remaining -= len(chunk)
+            await send({
+                "type": "http.response.body",
+                "body": chunk,
+                "more_body": remaining > 0,
+            })
+        if remaining > 0:
+            # Object shorter than its listed size; close the body cleanly
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -1,21 +1,23 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from api.services.admin_service import AdminService
+from api.db.database import get_db
+from api.dependencies import get_admin_service
+from sqlalchemy.orm import Session
 from typing import List
 
 router = APIRouter()
-admin_service = AdminService()
 
 @router.get("/files")
-async def list_files():
+async def list_files(db: Session = Depends(get_db), admin_service: AdminService = Depends(get_admin_service)):
     """List all uploaded files with their metadata."""
     try:
-        files = await admin_service.list_all_files()
+        files = await admin_service.list_all_files(db=db)
         return {"files": files}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/files/{file_id}")
-async def delete_file(file_id: str):
+async def delete_file(file_id: str, admin_service: AdminService = Depends(get_admin_service)):
     """Delete a file and all associated data."""
     try:
         result = await admin_service.delete_file(file_id)
@@ -24,7 +26,7 @@ async def delete_file(file_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/reindex")
-async def reindex_all():
+async def reindex_all(admin_service: AdminService = Depends(get_admin_service)):
     """Reindex all transcripts in the search engine."""
     try:
         result = await admin_service.reindex_all_transcripts()
@@ -33,7 +35,7 @@ async def reindex_all():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stats")
-async def get_system_stats():
+async def get_system_stats(admin_service: AdminService = Depends(get_admin_service)):
     """Get system statistics and health information."""
     try:
         stats = await admin_service.get_system_stats()
@@ -42,7 +44,7 @@ async def get_system_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/cleanup")
-async def cleanup_orphaned_files():
+async def cleanup_orphaned_files(admin_service: AdminService = Depends(get_admin_service)):
     """Clean up orphaned files and stale data."""
     try:
         result = await admin_service.cleanup_orphaned_files()
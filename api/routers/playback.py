@@ -1,57 +1,144 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from api.models.playback import PlaybackRequest, PlaybackResponse
+from api.responses import MediaFileResponse, StoredObjectResponse
 from api.services.playback_service import PlaybackService
+from api.db.database import get_db
+from api.dependencies import get_playback_service
+from api.storage import StoredObject
+from sqlalchemy.orm import Session
 
 router = APIRouter()
-playback_service = PlaybackService()
 
 @router.post("/", response_model=PlaybackResponse)
-async def get_playback_info(playback_request: PlaybackRequest):
+async def get_playback_info(
+    playback_request: PlaybackRequest,
+    db: Session = Depends(get_db),
+    playback_service: PlaybackService = Depends(get_playback_service)
+):
     """Get playback information for an audio file or segment."""
     try:
-        result = await playback_service.get_playback_info(playback_request)
+        result = await playback_service.get_playback_info(playback_request, db=db)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{file_id}")
-async def stream_audio(file_id: str, start_time: float = None, end_time: float = None):
+async def stream_audio(
+    request: Request,
+    file_id: str,
+    start_time: float = None,
+    end_time: float = None,
+    db: Session = Depends(get_db),
+    playback_service: PlaybackService = Depends(get_playback_service)
+):
     """Stream audio file or segment."""
     try:
-        audio_stream = await playback_service.stream_audio(file_id, start_time, end_time)
-        return StreamingResponse(
-            audio_stream,
-            media_type="audio/mpeg",
-            headers={"Content-Disposition": f"attachment; filename=\"{file_id}.mp3\""}
-        )
+        source = await playback_service.get_stream_source(file_id, start_time, end_time, db=db)
     except Exception as e:
         raise HTTPException(status_code=404, detail="Audio file not found")
+    finally:
+        # Return the connection to the pool now rather than when the stream ends
+        db.close()
+    return _media_response(request, source, playback_service)
 
 @router.get("/{file_id}/file")
-async def download_file(file_id: str):
+async def download_file(
+    request: Request,
+    file_id: str,
+    db: Session = Depends(get_db),
+    playback_service: PlaybackService = Depends(get_playback_service)
+):
     """Return the original media file (audio or video)."""
     try:
-        file_path = await playback_service.get_original_media_path(file_id)
-        # pick a basic media type; the client can rely on the file extension
-        return FileResponse(path=file_path, filename=file_path.split("/")[-1])
+        source = await playback_service.get_original_media_source(file_id, db=db)
     except Exception:
         raise HTTPException(status_code=404, detail="File not found")
+    finally:
+        db.close()
+    # pick a basic media type; the client can rely on the file extension
+    return _media_response(request, source, playback_service)
+
+@router.get("/{file_id}/waveform")
+async def get_waveform(
+    request: Request,
+    file_id: str,
+    level: int = Query(0, ge=0, description="Zoom level, 0 is the finest (~100 buckets/s)"),
+    start_time: float = Query(None, ge=0, description="Window start in seconds"),
+    end_time: float = Query(None, ge=0, description="Window end in seconds"),
+    playback_service: PlaybackService = Depends(get_playback_service),
+):
+    """Get precomputed waveform peaks as packed little-endian int8 (min, max, rms) triples."""
+    try:
+        peaks = await playback_service.get_waveform(file_id, level, start_time, end_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=404, detail="Waveform not found")
+
+    headers = {
+        "Cache-Control": "public, max-age=86400",
+        "ETag": peaks["etag"],
+        "X-Waveform-Sample-Rate": str(peaks["sample_rate"]),
+        "X-Waveform-Samples-Per-Bucket": str(peaks["samples_per_bucket"]),
+        "X-Waveform-Levels": ",".join(str(spb) for spb in peaks["levels"]),
+        "X-Waveform-Start-Bucket": str(peaks["start_bucket"]),
+        "X-Waveform-Bucket-Count": str(peaks["bucket_count"]),
+    }
+    if request.headers.get("if-none-match") == peaks["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=peaks["data"], media_type="application/octet-stream", headers=headers)
 
 @router.get("/{file_id}/info")
-async def get_audio_info(file_id: str):
+async def get_audio_info(
+    file_id: str,
+    db: Session = Depends(get_db),
+    playback_service: PlaybackService = Depends(get_playback_service)
+):
     """Get audio file information and metadata."""
     try:
-        info = await playback_service.get_audio_info(file_id)
+        info = await playback_service.get_audio_info(file_id, db=db)
         return info
     except Exception as e:
         raise HTTPException(status_code=404, detail="Audio file not found")
 
 @router.get("/{file_id}/transcript")
-async def get_transcript(file_id: str):
-    """Get transcript for an audio file."""
+async def get_transcript(
+    file_id: str,
+    start_time: float = Query(None, ge=0, description="Only segments ending after this time (seconds)"),
+    end_time: float = Query(None, ge=0, description="Only segments starting before this time (seconds)"),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(200, ge=1, le=1000, description="Segments per page"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every matching segment"),
+    db: Session = Depends(get_db),
+    playback_service: PlaybackService = Depends(get_playback_service),
+):
+    """Get transcript segments for an audio file, windowed and paginated."""
     try:
-        transcript = await playback_service.get_transcript(file_id)
+        if format == "ndjson":
+            return StreamingResponse(
+                playback_service.stream_transcript(file_id, start_time, end_time, cursor),
+                media_type="application/x-ndjson"
+            )
+        transcript = await playback_service.get_transcript(file_id, start_time, end_time, cursor, limit, db=db)
         return transcript
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=404, detail="Transcript not found")
+
+def _media_response(request: Request, source, playback_service: PlaybackService) -> MediaFileResponse:
+    """Serve a local copy from disk, or stream a stored object that has none on this host."""
+    if isinstance(source, StoredObject):
+        return StoredObjectResponse(
+            playback_service.storage,
+            source,
+            range_header=request.headers.get("range"),
+            method=request.method,
+        )
+    return MediaFileResponse(
+        source,
+        range_header=request.headers.get("range"),
+        filename=source.split("/")[-1],
+        method=request.method,
+    )
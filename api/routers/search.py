@@ -1,21 +1,50 @@
-from fastapi import APIRouter, HTTPException, Query
-from api.models.search import SearchRequest, SearchResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from api.models.search import (
+    SearchRequest, SearchResponse, BatchSearchRequest, BatchSearchResponse, SuggestResponse
+)
 from api.services.search_service import SearchService
+from api.db.database import get_db
+from api.dependencies import get_search_service
+from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime
 
 router = APIRouter()
-search_service = SearchService()
 
 @router.post("/", response_model=SearchResponse)
-async def search_audio_content(search_request: SearchRequest):
+async def search_audio_content(
+    search_request: SearchRequest,
+    db: Session = Depends(get_db),
+    search_service: SearchService = Depends(get_search_service)
+):
     """Search through transcribed audio content."""
     try:
-        results = await search_service.search(search_request)
+        results = await search_service.search(search_request, db=db)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/batch", response_model=BatchSearchResponse)
+async def search_audio_content_batch(
+    batch_request: BatchSearchRequest,
+    search_service: SearchService = Depends(get_search_service)
+):
+    """Run several searches in one round trip; results come back in request order."""
+    try:
+        results = await search_service.search_batch(batch_request)
+        return results
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    prefix: str = Query(..., description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Number of suggestions to return"),
+    search_service: SearchService = Depends(get_search_service)
+):
+    """Type-ahead completions of terms and frequent phrases, ranked by how many segments contain them."""
+    return await search_service.suggest(prefix, limit)
+
 @router.get("/", response_model=SearchResponse)
 async def search_audio_content_get(
     query: str = Query(..., description="Search query"),
@@ -23,7 +52,10 @@ async def search_audio_content_get(
     offset: int = Query(0, ge=0, description="Offset for pagination"),
     file_ids: Optional[str] = Query(None, description="Comma-separated file IDs to search within"),
     date_from: Optional[datetime] = Query(None, description="Search from this date"),
-    date_to: Optional[datetime] = Query(None, description="Search to this date")
+    date_to: Optional[datetime] = Query(None, description="Search to this date"),
+    snippet_chars: int = Query(160, ge=0, description="Snippet length around the best match; 0 for the whole segment"),
+    db: Session = Depends(get_db),
+    search_service: SearchService = Depends(get_search_service)
 ):
     """Search through transcribed audio content using GET parameters."""
     
@@ -37,11 +69,12 @@ async def search_audio_content_get(
         offset=offset,
         file_ids=file_ids_list,
         date_from=date_from,
-        date_to=date_to
+        date_to=date_to,
+        snippet_chars=snippet_chars
     )
     
     try:
-        results = await search_service.search(search_request)
+        results = await search_service.search(search_request, db=db)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
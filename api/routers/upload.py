@@ -1,18 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
-from api.models.upload import UploadResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Header, Request, Depends
+from api.models.upload import UploadResponse, UploadSessionRequest, UploadSessionResponse
 from api.services.upload_service import UploadService
+from api.services.upload_session_service import UploadSessionService
 from api.config import settings
+from api.db.database import get_db
+from api.dependencies import get_upload_service, get_upload_session_service
+from sqlalchemy.orm import Session
 
 router = APIRouter(redirect_slashes=False)
-upload_service = UploadService()
 
-@router.post("/", response_model=UploadResponse)
-@router.post("", response_model=UploadResponse)
-async def upload_audio_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    """Upload an audio file for transcription and indexing."""
-    
-    # Validate file format
-    file_extension = file.filename.split('.')[-1].lower()
+def _validate_upload(filename: str, file_size: int | None):
+    """Reject unsupported formats and oversized files."""
+    file_extension = filename.split('.')[-1].lower()
     if file_extension not in settings.allowed_audio_formats + settings.allowed_video_formats:
         raise HTTPException(
             status_code=400, 
@@ -23,12 +22,22 @@ async def upload_audio_file(background_tasks: BackgroundTasks, file: UploadFile
             )
         )
     
-    # Validate file size
-    if hasattr(file, 'size') and file.size > settings.max_file_size:
+    if file_size is not None and file_size > settings.max_file_size:
         raise HTTPException(
             status_code=413,
             detail=f"File too large. Maximum size: {settings.max_file_size / (1024*1024):.0f}MB"
         )
+
+@router.post("/", response_model=UploadResponse)
+@router.post("", response_model=UploadResponse)
+async def upload_audio_file(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Upload an audio file for transcription and indexing."""
+    
+    _validate_upload(file.filename, getattr(file, 'size', None))
     
     try:
         result = await upload_service.process_upload(file, background_tasks)
@@ -37,10 +46,80 @@ async def upload_audio_file(background_tasks: BackgroundTasks, file: UploadFile
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/status/{file_id}")
-async def get_upload_status(file_id: str):
+async def get_upload_status(
+    file_id: str,
+    db: Session = Depends(get_db),
+    upload_service: UploadService = Depends(get_upload_service)
+):
     """Get the processing status of an uploaded file."""
     try:
-        status = await upload_service.get_upload_status(file_id)
+        status = await upload_service.get_upload_status(file_id, db=db)
         return status
     except Exception as e:
         raise HTTPException(status_code=404, detail="File not found")
+
+@router.post("/sessions", response_model=UploadSessionResponse)
+async def create_upload_session(
+    session_request: UploadSessionRequest,
+    upload_session_service: UploadSessionService = Depends(get_upload_session_service)
+):
+    """Start a resumable upload; PUT its parts in any order, then complete it."""
+    _validate_upload(session_request.filename, session_request.file_size)
+    try:
+        return await upload_session_service.create_session(session_request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/sessions/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    upload_session_service: UploadSessionService = Depends(get_upload_session_service)
+):
+    """Get an upload session, including which parts have been received."""
+    try:
+        return await upload_session_service.get_session(session_id)
+    except (ValueError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+@router.put("/sessions/{session_id}/parts/{part_number}")
+async def upload_part(
+    request: Request,
+    session_id: str,
+    part_number: int,
+    x_checksum_sha256: str = Header(..., description="Hex SHA-256 of the part body"),
+    upload_session_service: UploadSessionService = Depends(get_upload_session_service)
+):
+    """Upload one part as the raw request body. Parts may be sent in parallel."""
+    try:
+        return await upload_session_service.write_part(
+            session_id, part_number, request.stream(), x_checksum_sha256
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/sessions/{session_id}/complete", response_model=UploadResponse)
+async def complete_upload_session(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    upload_session_service: UploadSessionService = Depends(get_upload_session_service)
+):
+    """Assemble the uploaded parts and process the file like a regular upload."""
+    try:
+        return await upload_session_service.complete_session(session_id, background_tasks)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.delete("/sessions/{session_id}")
+async def abort_upload_session(
+    session_id: str,
+    upload_session_service: UploadSessionService = Depends(get_upload_session_service)
+):
+    """Abort an upload session and discard its parts."""
+    try:
+        return await upload_session_service.abort_session(session_id)
+    except (ValueError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="Upload session not found")
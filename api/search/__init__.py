@@ -0,0 +1 @@
+# Search engine modules
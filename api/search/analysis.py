@@ -0,0 +1,65 @@
+"""
+Text analysis shared by indexing and querying.
+
+Terms are lowercased word tokens. At index time we record where each term
+occurs in a segment (character offsets and token position), so query-time
+features such as snippets, highlighting and match times never have to
+re-tokenize stored text.
+"""
+import json
+import re
+from typing import Dict, Iterator, List, Tuple
+
+_TOKEN_RE = re.compile(r"\w+(?:'\w+)*")
+
+# Stored offsets open with this key, which is never a term, holding the
+# number of fields per occurrence. Offsets stored before token positions were
+# recorded are bare [start, length] pairs without it.
+_FIELDS_KEY = ""
+OFFSET_FIELDS = 3  # start, length, token position
+_SEPARATORS = (",", ":")
+# What every row stored in the current format starts with
+STORED_OFFSETS_PREFIX = json.dumps({_FIELDS_KEY: OFFSET_FIELDS}, separators=_SEPARATORS)[:-1]
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, int, int]]:
+    """Yield (term, start, end) for each token in `text`."""
+    for match in _TOKEN_RE.finditer(text):
+        yield match.group().lower(), match.start(), match.end()
+
+
+def query_terms(query: str) -> List[str]:
+    """Return the distinct terms of a query, in order."""
+    return list(dict.fromkeys(term for term, _, _ in tokenize(query)))
+
+
+def term_offsets(text: str) -> Dict[str, List[int]]:
+    """Map each term to its flattened [start, length, position, ...] occurrences.
+
+    Positions index `tokenize(text)`, as in the positional index and the
+    stored word timings.
+    """
+    offsets: Dict[str, List[int]] = {}
+    for position, (term, start, end) in enumerate(tokenize(text)):
+        offsets.setdefault(term, []).extend((start, end - start, position))
+    return offsets
+
+
+def encode_term_offsets(text: str) -> str:
+    """Serialize term offsets for storage on a Transcript row."""
+    offsets: Dict[str, object] = {_FIELDS_KEY: OFFSET_FIELDS}
+    offsets.update(term_offsets(text))
+    return json.dumps(offsets, separators=_SEPARATORS, ensure_ascii=False)
+
+
+def decode_term_offsets(data: str) -> Dict[str, List[int]]:
+    """Inverse of `encode_term_offsets`; occurrences stored without a position get -1."""
+    if not data:
+        return {}
+    offsets = json.loads(data)
+    if offsets.pop(_FIELDS_KEY, None) == OFFSET_FIELDS:
+        return offsets
+    return {
+        term: [value for i in range(0, len(flat), 2) for value in (flat[i], flat[i + 1], -1)]
+        for term, flat in offsets.items()
+    }
@@ -0,0 +1,148 @@
+"""
+Positional inverted index for phrase and proximity queries.
+
+For every term the index segments (see `api.search.segments`) record, per
+transcript segment, the token positions where it occurs. Positions index
+into `analysis.tokenize(text)` and so line up with the segment's word
+timings. Queries:
+
+    "budget review"      exact phrase: consecutive, in order
+    "budget review"~3    proximity: all terms within a window of
+                         len(terms) - 1 + 3 token positions, any order
+
+Every hit carries the first and last matched token positions, which the
+search service maps to exact start and end times.
+"""
+import heapq
+import re
+from typing import List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from api.search.analysis import tokenize
+from api.search.segments import IndexSegment
+from api.search.store import IndexSnapshot, IndexStore, get_index_stores
+
+_PHRASE_RE = re.compile(r'^\s*"([^"]+)"\s*(?:~\s*(\d+))?\s*$')
+
+
+class PhraseQuery(NamedTuple):
+    terms: List[str]
+    slop: int  # 0 for an exact phrase
+
+
+class PhraseHit(NamedTuple):
+    segment_id: int
+    first_position: int
+    last_position: int
+
+
+def parse_phrase_query(query: str) -> Optional[PhraseQuery]:
+    """Parse `"words"` or `"words"~N`; None for anything else."""
+    match = _PHRASE_RE.match(query)
+    if not match:
+        return None
+    terms = [term for term, _, _ in tokenize(match.group(1))]
+    if not terms:
+        return None
+    return PhraseQuery(terms=terms, slop=int(match.group(2) or 0))
+
+
+class PositionalIndex:
+    """Phrase and proximity search over the memory-mapped segments of one or more `IndexStore`s."""
+
+    def __init__(self, stores: List[Union[IndexStore, IndexSnapshot]]):
+        self.stores = stores
+
+    def snapshot(self) -> "PositionalIndex":
+        """An index over the stores' current segments, for several queries that should agree."""
+        return PositionalIndex([store.snapshot() for store in self.stores])
+
+    def search(self, query: PhraseQuery, limit: Optional[int] = None) -> List[PhraseHit]:
+        """Return the best match per segment, tightest and earliest segments first.
+
+        With `limit`, only the top `limit` hits are kept.
+        """
+        hits = []
+        for store in self.stores:
+            # One consistent snapshot per store; a concurrent refresh swaps in new objects
+            segments, deleted = store.segments, store.deleted_file_ids
+            for segment in segments.values():
+                hits.extend(_search_segment(segment, deleted, query))
+
+        if limit is not None and limit < len(hits):
+            return heapq.nsmallest(limit, hits, key=hit_rank)
+        hits.sort(key=hit_rank)
+        return hits
+
+
+def hit_rank(hit: PhraseHit) -> Tuple[int, int]:
+    """Sort key for hits: tighter matches first, then by segment ID. Comparable across shards."""
+    return hit.last_position - hit.first_position, hit.segment_id
+
+
+def _search_segment(segment: IndexSegment, deleted: Set[str], query: PhraseQuery) -> List[PhraseHit]:
+    # A transcript segment (doc) lives in exactly one index segment
+    distinct = list(dict.fromkeys(query.terms))
+    postings = {term: segment.postings(term) for term in distinct}
+    if not all(postings.values()):
+        return []
+
+    # Intersect from the rarest term
+    ordered = sorted(postings.values(), key=len)
+    candidates = set(ordered[0])
+    for term_postings in ordered[1:]:
+        candidates.intersection_update(term_postings)
+
+    hits = []
+    for doc_id in candidates:
+        if deleted and segment.file_of(doc_id) in deleted:
+            continue
+        if query.slop == 0:
+            match = _exact_match([postings[term][doc_id] for term in query.terms])
+        else:
+            match = _proximity_match(
+                [postings[term][doc_id] for term in distinct],
+                len(query.terms) - 1 + query.slop
+            )
+        if match is not None:
+            hits.append(PhraseHit(doc_id, *match))
+    return hits
+
+
+def _exact_match(positions: List[Sequence[int]]) -> Optional[Tuple[int, int]]:
+    """First position where the terms occur consecutively, in order."""
+    following = [set(term_positions) for term_positions in positions[1:]]
+    for start in positions[0]:
+        if all(start + offset in term_positions for offset, term_positions in enumerate(following, 1)):
+            return start, start + len(positions) - 1
+    return None
+
+
+def _proximity_match(positions: List[Sequence[int]], max_span: int) -> Optional[Tuple[int, int]]:
+    """Smallest window containing every term, if it spans at most `max_span` positions."""
+    # Merge all occurrences, then slide a window that covers every term
+    merged = sorted((position, term) for term, term_positions in enumerate(positions)
+                    for position in term_positions)
+    counts = [0] * len(positions)
+    covered = 0
+    best = None
+    left = 0
+    for right_position, right_term in merged:
+        if counts[right_term] == 0:
+            covered += 1
+        counts[right_term] += 1
+        while covered == len(positions):
+            left_position, left_term = merged[left]
+            if best is None or right_position - left_position < best[1] - best[0]:
+                best = (left_position, right_position)
+            counts[left_term] -= 1
+            if counts[left_term] == 0:
+                covered -= 1
+            left += 1
+    if best is None or best[1] - best[0] > max_span:
+        return None
+    return best
+
+
+def get_positional_index() -> PositionalIndex:
+    """Return a positional index over this process's view of every index shard."""
+    return PositionalIndex(get_index_stores())
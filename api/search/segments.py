@@ -0,0 +1,280 @@
+"""
+Immutable on-disk index segments.
+
+A segment holds the positional index, plus term and phrase document
+frequencies, for a set of transcribed files. Segments are written once and
+then only read through `mmap`, so every worker process shares the same
+pages through the OS page cache instead of holding its own copy, and
+opening one is a header parse rather than a rebuild.
+
+Layout, little-endian, every section padded to 8 bytes:
+
+    header    "<4sHHIIIIQQQQQ"  magic b"EFIX", version, reserved,
+              file_count, doc_count, term_count, phrase_count,
+              files_offset, docs_offset, terms_offset, postings_offset,
+              phrases_offset
+    files     string table of file IDs
+    docs      uint32 doc_ids[doc_count] (sorted), uint32 file_ordinals[doc_count]
+    terms     string table of terms (sorted),
+              uint64 postings_offsets[term_count], uint32 dfs[term_count]
+    postings  per term: uint32 doc_ids[df], uint32 position_counts[df],
+              uint32 positions[sum(position_counts)]
+    phrases   string table of two-word phrases (sorted), uint32 dfs[phrase_count]
+
+A string table is uint32 offsets[count + 1] followed by the UTF-8 bytes.
+Doc IDs are `Transcript.id` values; positions index `analysis.tokenize`.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+MAGIC = b"EFIX"
+VERSION = 1
+SEGMENT_SUFFIX = ".eidx"
+
+_HEADER = struct.Struct("<4sHHIIIIQQQQQ")
+
+# (doc_id, file_id, tokens)
+Doc = Tuple[int, str, List[str]]
+
+
+def write_segment(path: str, docs: Iterable[Doc]) -> int:
+    """Write `docs` as a segment at `path`. Returns the number of docs written."""
+    docs = sorted(docs, key=lambda doc: doc[0])
+    file_ids = sorted({file_id for _, file_id, _ in docs})
+    file_ordinal = {file_id: i for i, file_id in enumerate(file_ids)}
+
+    postings: Dict[str, List[Tuple[int, List[int]]]] = {}
+    phrase_df: Counter = Counter()
+    for doc_id, _, tokens in docs:
+        positions: Dict[str, List[int]] = {}
+        for position, term in enumerate(tokens):
+            positions.setdefault(term, []).append(position)
+        for term, term_positions in positions.items():
+            postings.setdefault(term, []).append((doc_id, term_positions))
+        phrase_df.update({f"{a} {b}" for a, b in zip(tokens, tokens[1:])})
+
+    terms = sorted(postings)
+    phrases = sorted(phrase_df)
+
+    postings_blob = bytearray()
+    postings_offsets = array("Q")
+    for term in terms:
+        postings_offsets.append(len(postings_blob))
+        term_postings = postings[term]
+        postings_blob += _u32([doc_id for doc_id, _ in term_postings])
+        postings_blob += _u32([len(term_positions) for _, term_positions in term_postings])
+        postings_blob += _u32([p for _, term_positions in term_postings for p in term_positions])
+
+    sections = [
+        _string_table(file_ids),
+        _u32([doc_id for doc_id, _, _ in docs]) + _u32([file_ordinal[file_id] for _, file_id, _ in docs]),
+        _padded(_string_table(terms)) + _native(postings_offsets) + _u32([len(postings[term]) for term in terms]),
+        bytes(postings_blob),
+        _padded(_string_table(phrases)) + _u32([phrase_df[phrase] for phrase in phrases]),
+    ]
+    section_offsets = []
+    offset = _HEADER.size
+    for section in sections:
+        offset = _pad_to(offset)
+        section_offsets.append(offset)
+        offset += len(section)
+
+    header = _HEADER.pack(MAGIC, VERSION, 0, len(file_ids), len(docs), len(terms), len(phrases), *section_offsets)
+
+    # Write-then-rename so readers never map a partial file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for section, section_offset in zip(sections, section_offsets):
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(docs)
+
+
+class IndexSegment:
+    """Read-only, memory-mapped view of one segment file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        (magic, version, _, file_count, doc_count, term_count, phrase_count,
+         files_offset, docs_offset, terms_offset, postings_offset, phrases_offset) = _HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unrecognised index segment: {path}")
+
+        self.doc_count = doc_count
+        self.term_count = term_count
+        self.phrase_count = phrase_count
+        self.file_ids: List[str] = list(_StringTable(self._view, files_offset, file_count))
+        self._doc_ids = _read_u32(self._view, docs_offset, doc_count)
+        self._doc_files = _read_u32(self._view, docs_offset + 4 * doc_count, doc_count)
+
+        self._terms = _StringTable(self._view, terms_offset, term_count)
+        offsets_at = _pad_to(terms_offset + self._terms.nbytes)
+        self._postings_offsets = _read_u64(self._view, offsets_at, term_count)
+        self._dfs = _read_u32(self._view, offsets_at + 8 * term_count, term_count)
+        self._postings_offset = postings_offset
+
+        self._phrases = _StringTable(self._view, phrases_offset, phrase_count)
+        self._phrase_dfs = _read_u32(self._view, _pad_to(phrases_offset + self._phrases.nbytes), phrase_count)
+
+    def postings(self, term: str) -> Optional[Dict[int, Sequence[int]]]:
+        """Map doc ID -> positions for `term`, or None if the segment lacks it."""
+        i = self._terms.find(term)
+        if i < 0:
+            return None
+        df = self._dfs[i]
+        at = self._postings_offset + self._postings_offsets[i]
+        doc_ids = _read_u32(self._view, at, df)
+        counts = _read_u32(self._view, at + 4 * df, df)
+        positions = _read_u32(self._view, at + 8 * df, sum(counts))
+        result = {}
+        start = 0
+        for doc_id, count in zip(doc_ids, counts):
+            result[doc_id] = positions[start:start + count]
+            start += count
+        return result
+
+    def file_of(self, doc_id: int) -> Optional[str]:
+        """Return the file a doc belongs to."""
+        lo = bisect_left(self._doc_ids, doc_id)
+        if lo < self.doc_count and self._doc_ids[lo] == doc_id:
+            return self.file_ids[self._doc_files[lo]]
+        return None
+
+    def term_dfs(self) -> Iterator[Tuple[str, int]]:
+        return zip(self._terms, self._dfs)
+
+    def phrase_dfs(self) -> Iterator[Tuple[str, int]]:
+        return zip(self._phrases, self._phrase_dfs)
+
+    def docs(self, skip_file_ids: Set[str] = frozenset()) -> Iterator[Doc]:
+        """Reconstruct every doc's token sequence; used when merging."""
+        skip = {i for i, file_id in enumerate(self.file_ids) if file_id in skip_file_ids}
+        live = {doc_id: file for doc_id, file in zip(self._doc_ids, self._doc_files) if file not in skip}
+        tokens: Dict[int, Dict[int, str]] = {doc_id: {} for doc_id in live}
+        for term in self._terms:
+            for doc_id, positions in self.postings(term).items():
+                if doc_id in tokens:
+                    for position in positions:
+                        tokens[doc_id][position] = term
+        for doc_id, file in live.items():
+            by_position = tokens[doc_id]
+            yield doc_id, self.file_ids[file], [by_position[p] for p in sorted(by_position)]
+
+    def close(self) -> None:
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Slices handed to a query are still alive; the map closes once they are collected
+            pass
+
+
+def merge_segments(input_paths: List[str], deleted_file_ids: List[str], output_path: str) -> Optional[str]:
+    """Merge segments into one, dropping deleted files.
+
+    Runs inside a worker process. Returns `output_path`, or None when no docs
+    remain (the inputs can simply be dropped).
+    """
+    deleted = set(deleted_file_ids)
+    segments = [IndexSegment(path) for path in input_paths]
+    try:
+        docs = [doc for segment in segments for doc in segment.docs(deleted)]
+        if not docs:
+            return None
+        write_segment(output_path, docs)
+        return output_path
+    finally:
+        for segment in segments:
+            segment.close()
+
+
+class _StringTable:
+    """Sorted (or ordered) strings stored as offsets + UTF-8 bytes."""
+
+    def __init__(self, view: memoryview, offset: int, count: int):
+        self._count = count
+        self._offsets = _read_u32(view, offset, count + 1)
+        self._data = view[offset + 4 * (count + 1):]
+        self.nbytes = 4 * (count + 1) + self._offsets[count]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self._data[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(self._count))
+
+    def find(self, value: str) -> int:
+        """Binary search a sorted table; -1 when absent."""
+        target = value.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._data[self._offsets[mid]:self._offsets[mid + 1]]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and bytes(self._data[self._offsets[lo]:self._offsets[lo + 1]]) == target:
+            return lo
+        return -1
+
+
+def _string_table(values: List[str]) -> bytes:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    return _u32(offsets) + b"".join(encoded)
+
+
+def _padded(data: bytes) -> bytes:
+    return data + b"\0" * (_pad_to(len(data)) - len(data))
+
+
+def _pad_to(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _u32(values: Iterable[int]) -> bytes:
+    return _native(array("I", values))
+
+
+def _native(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_u32(view: memoryview, offset: int, count: int) -> Sequence[int]:
+    return _read(view, offset, count, "I", 4)
+
+
+def _read_u64(view: memoryview, offset: int, count: int) -> Sequence[int]:
+    return _read(view, offset, count, "Q", 8)
+
+
+def _read(view: memoryview, offset: int, count: int, typecode: str, size: int) -> Sequence[int]:
+    data = view[offset:offset + size * count]
+    if sys.byteorder == "little":
+        # Zero-copy: indexes straight into the mapped pages
+        return data.cast(typecode)
+    values = array(typecode, data)
+    values.byteswap()
+    return values
@@ -0,0 +1,127 @@
+"""
+Scatter-gather phrase search over index shards, one dedicated process per shard.
+
+With `search_shards` > 1 the index is partitioned by file ID hash (see
+`api.search.store`). Every shard gets its own single-process pool whose
+worker maps only that shard's segments, so the shards rank in parallel on
+separate cores instead of taking turns on one interpreter. A query is
+scattered to all shards, each returns its own top `limit` hits, and these
+are merged by `hit_rank`, which compares the same way across shards.
+
+A shard that misses `search_shard_timeout` is left out of that response
+rather than holding it up. Its process still finishes the query, so a
+persistently slow shard shows up as repeated timeouts in the log.
+
+Each serving worker starts its own shard processes: size `search_shards`
+to roughly cores / `api_workers`.
+"""
+import asyncio
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import List, Optional
+
+from api.config import settings
+from api.search.positional import PhraseHit, PhraseQuery, PositionalIndex, hit_rank
+from api.search.store import IndexStore, index_dirs
+
+
+class ShardPool:
+    """Dedicated search processes, one per index shard."""
+
+    def __init__(self, shard_dirs: List[str], timeout: float):
+        self.shard_dirs = shard_dirs
+        self.timeout = timeout
+        self._executors = [self._start_shard(shard_dir) for shard_dir in shard_dirs]
+
+    async def start(self) -> None:
+        """Spawn the shard processes and map their segments before the first query."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(shard_executor, _search_shard, None, 0)
+            for shard_executor in self._executors
+        ))
+
+    async def search(self, query: PhraseQuery, limit: int) -> List[PhraseHit]:
+        """Return the global top `limit` hits across all shards that answered in time."""
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            asyncio.wait_for(loop.run_in_executor(shard_executor, _search_shard, query, limit), self.timeout)
+            for shard_executor in self._executors
+        ), return_exceptions=True)
+
+        shard_hits = []
+        for shard, result in enumerate(results):
+            if isinstance(result, BrokenProcessPool):
+                # The shard process died; start a fresh one for the next query
+                print(f"Search shard {shard} crashed; restarting it")
+                self._executors[shard] = self._start_shard(self.shard_dirs[shard])
+            elif isinstance(result, asyncio.TimeoutError):
+                print(f"Search shard {shard} timed out after {self.timeout}s")
+            elif isinstance(result, BaseException):
+                print(f"Search shard {shard} failed: {result}")
+            else:
+                shard_hits.append(result)
+
+        if not shard_hits:
+            raise RuntimeError("No search shard answered")
+        return list(heapq.merge(*shard_hits, key=hit_rank))[:limit]
+
+    def shutdown(self) -> None:
+        """Stop the shard processes without waiting for queries still running in them."""
+        for shard_executor in self._executors:
+            shard_executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _start_shard(shard_dir: str) -> ProcessPoolExecutor:
+        # spawn: forking a threaded server process is not safe
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=get_context("spawn"),
+            initializer=_open_shard,
+            initargs=(shard_dir,),
+        )
+
+
+_pool: Optional[ShardPool] = None
+
+
+def get_shard_pool() -> ShardPool:
+    """Return this process's shard pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ShardPool(index_dirs(), settings.search_shard_timeout)
+    return _pool
+
+
+def shutdown_shard_pool() -> None:
+    """Stop the shard processes, if they were started."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+def reset_after_fork() -> None:
+    """Forget a pool inherited from the parent; the child starts its own on first use."""
+    global _pool
+    _pool = None
+
+
+# State of a shard process
+_shard_index: Optional[PositionalIndex] = None
+
+
+def _open_shard(shard_dir: str) -> None:
+    global _shard_index
+    _shard_index = PositionalIndex([IndexStore(shard_dir)])
+
+
+def _search_shard(query: Optional[PhraseQuery], limit: int) -> List[PhraseHit]:
+    for store in _shard_index.stores:
+        # A stat() unless the manifest changed, so appends are visible to the next query
+        store.refresh()
+    if query is None:
+        return []
+    return _shard_index.search(query, limit)
@@ -0,0 +1,102 @@
+"""
+Query-aware snippets with highlight spans.
+
+Given the term offsets stored for a segment, pick the window of at most
+`max_chars` characters that covers the most distinct query terms, and
+return it with highlight spans relative to the snippet and the token
+position of each highlighted word.
+"""
+from typing import Dict, List, NamedTuple, Optional
+
+from api.search.analysis import OFFSET_FIELDS, decode_term_offsets
+
+
+class Snippet(NamedTuple):
+    text: str
+    offset: int  # where the snippet starts in the full segment text
+    highlights: List[List[int]]  # [start, end) pairs relative to `text`
+    positions: List[Optional[int]]  # Token position of each highlight; None if not stored
+
+
+def build_snippet(
+    text: str,
+    stored_offsets: Optional[str],
+    terms: List[str],
+    max_chars: int,
+) -> Snippet:
+    """Build a bounded snippet around the best-matching window of `text`."""
+    offsets = decode_term_offsets(stored_offsets)
+    spans = _matching_spans(offsets, terms)
+
+    if max_chars <= 0 or len(text) <= max_chars:
+        return _snippet(text, 0, spans)
+
+    if not spans:
+        return Snippet(text=_trim_end(text, 0, max_chars), offset=0, highlights=[], positions=[])
+
+    # Slide over spans (sorted by start) to find the window with most distinct terms
+    best_left, best_right, best_score = 0, 0, -1
+    left = 0
+    for right in range(len(spans)):
+        while left < right and spans[right][1] - spans[left][0] > max_chars:
+            left += 1
+        score = len({term for _, _, term, _ in spans[left:right + 1]})
+        if score > best_score:
+            best_left, best_right, best_score = left, right, score
+
+    covered_start = spans[best_left][0]
+    covered_end = spans[best_right][1]
+    # Centre the matched region in the window, then snap to word boundaries
+    slack = max_chars - (covered_end - covered_start)
+    start = max(0, min(covered_start - slack // 2, len(text) - max_chars))
+    start = _snap_start(text, start, covered_start)
+    snippet = _trim_end(text, start, max_chars, covered_end)
+    end = start + len(snippet)
+    return _snippet(snippet, start, [span for span in spans if span[0] >= start and span[1] <= end])
+
+
+def _snippet(text: str, offset: int, spans: list) -> Snippet:
+    return Snippet(
+        text=text,
+        offset=offset,
+        highlights=[[s - offset, e - offset] for s, e, _, _ in spans],
+        positions=[position if position >= 0 else None for _, _, _, position in spans],
+    )
+
+
+def _matching_spans(offsets: Dict[str, List[int]], terms: List[str]) -> list:
+    """Return sorted (start, end, query_term, position) spans for stored terms matching the query.
+
+    A stored term matches a query term when it starts with it, mirroring the
+    substring semantics of the database search for partially typed words.
+    """
+    spans = []
+    for stored_term, flat in offsets.items():
+        for query_term in terms:
+            if stored_term.startswith(query_term):
+                spans.extend(
+                    (flat[i], flat[i] + flat[i + 1], query_term, flat[i + 2])
+                    for i in range(0, len(flat), OFFSET_FIELDS)
+                )
+                break
+    spans.sort()
+    return spans
+
+
+def _snap_start(text: str, start: int, limit: int) -> int:
+    """Move `start` forward to the beginning of a word, not past `limit`."""
+    if start == 0 or text[start - 1].isspace():
+        return start
+    space = text.find(" ", start, limit)
+    return space + 1 if space != -1 else start
+
+
+def _trim_end(text: str, start: int, max_chars: int, keep_until: int = 0) -> str:
+    """Cut `text[start:]` to `max_chars`, preferring to end on a word boundary."""
+    end = start + max_chars
+    if end >= len(text):
+        return text[start:]
+    space = text.rfind(" ", start, end)
+    if space >= max(start + max_chars // 2, keep_until):
+        end = space
+    return text[start:end]
@@ -0,0 +1,238 @@
+"""
+The on-disk search index: a manifest of immutable segments.
+
+    {index_dir}/manifest.json     {"generation": N, "segments": [...], "deleted_file_ids": [...]}
+    {index_dir}/seg-{N}.eidx      segments, see api.search.segments
+    {index_dir}/.lock             flock held while the manifest is read-modified-written
+                                  (shared by a refresh that lost a race with a merge)
+    {index_dir}/.merge.lock       flock held by the one process currently merging
+
+Newly transcribed files are appended as small delta segments. Deleted files
+are recorded as tombstones and filtered at query time until a background
+merge rewrites the segments that contain them. Merges also fold deltas into
+larger segments once there are more than `max_segments`.
+
+Every worker process opens the same segment files read-only with mmap and
+follows the manifest with `refresh`, so a warm start is a manifest read and
+a few mmap calls, and the index pages are shared through the page cache.
+Segment files are unlinked only after a merge replaced them; processes that
+still map them keep a valid view until they refresh.
+
+With `search_shards` > 1 the corpus is partitioned by file ID hash and each
+shard is an independent index like the above in `{index_dir}/shard-NN`.
+
+fcntl locks make this POSIX-only, like the gunicorn serving mode.
+"""
+import fcntl
+import json
+import os
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from api.config import settings
+from api.search.segments import SEGMENT_SUFFIX, Doc, IndexSegment, write_segment
+
+MANIFEST = "manifest.json"
+
+
+class MergePlan(NamedTuple):
+    inputs: List[str]  # Segment file names to replace
+    deleted_file_ids: List[str]  # Tombstones the merge applies
+    output: str  # File name of the merged segment
+
+
+class IndexSnapshot(NamedTuple):
+    """A store's segments and tombstones at one moment; later refreshes don't change it."""
+    segments: Dict[str, IndexSegment]
+    deleted_file_ids: Set[str]
+
+
+class IndexStore:
+    """One process's view of the on-disk index."""
+
+    def __init__(self, index_dir: str, max_segments: int = 8):
+        self.index_dir = index_dir
+        self.max_segments = max_segments
+        self.segments: Dict[str, IndexSegment] = {}
+        self.deleted_file_ids: Set[str] = set()
+        self._manifest_stamp: Optional[Tuple[int, int]] = None
+
+    @property
+    def file_ids(self) -> Set[str]:
+        """Files with live (not deleted) entries in the index."""
+        indexed = set()
+        for segment in self.segments.values():
+            indexed.update(segment.file_ids)
+        return indexed - self.deleted_file_ids
+
+    def snapshot(self) -> IndexSnapshot:
+        """The current view, kept mapped for as long as the snapshot is referenced."""
+        return IndexSnapshot(self.segments, self.deleted_file_ids)
+
+    def refresh(self) -> bool:
+        """Follow the manifest: map new segments, drop replaced ones. Returns whether anything changed.
+
+        State is swapped in whole (never mutated in place), so queries holding
+        the previous `segments` dict are unaffected and this may run on any thread.
+        Dropped segments are unmapped once nothing references them.
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        stamp = self._stamp()
+        if stamp is not None and stamp == self._manifest_stamp:
+            return False
+        try:
+            return self._load(stamp)
+        except FileNotFoundError:
+            # A merge in another process unlinked a segment between our manifest
+            # read and its mmap. Merges unlink only after replacing the manifest,
+            # and can't replace it while we hold the lock, so this read is stable.
+            with self._locked(".lock", shared=True):
+                return self._load(self._stamp())
+
+    def _load(self, stamp: Optional[Tuple[int, int]]) -> bool:
+        manifest = self._read_manifest()
+        segments = {
+            name: self.segments.get(name) or IndexSegment(os.path.join(self.index_dir, name))
+            for name in manifest["segments"]
+        }
+        deleted = set(manifest["deleted_file_ids"])
+        changed = segments.keys() != self.segments.keys() or deleted != self.deleted_file_ids
+        self.segments = segments
+        self.deleted_file_ids = deleted
+        self._manifest_stamp = stamp
+        return changed
+
+    def append(self, docs: Iterable[Doc]) -> Optional[str]:
+        """Write docs of files not yet indexed as a new delta segment."""
+        with self._locked(".lock"):
+            # Not refresh(): the manifest is already stable under the lock
+            self._load(self._stamp())
+            indexed = self.file_ids | self.deleted_file_ids
+            docs = [doc for doc in docs if doc[1] not in indexed]
+            if not docs:
+                return None
+            manifest = self._read_manifest()
+            name = self._next_name(manifest)
+            write_segment(os.path.join(self.index_dir, name), docs)
+            manifest["segments"].append(name)
+            self._write_manifest(manifest)
+            return name
+
+    def delete_files(self, file_ids: Iterable[str]) -> None:
+        """Tombstone files; their entries disappear from queries immediately."""
+        with self._locked(".lock"):
+            manifest = self._read_manifest()
+            deleted = set(manifest["deleted_file_ids"]) | set(file_ids)
+            manifest["deleted_file_ids"] = sorted(deleted)
+            self._write_manifest(manifest)
+
+    @contextmanager
+    def merging(self) -> Iterator[Optional[MergePlan]]:
+        """Plan a merge under the merge lock; None if there's nothing to do or another process is merging."""
+        try:
+            with self._locked(".merge.lock", blocking=False):
+                yield self._plan_merge()
+        except BlockingIOError:
+            yield None
+
+    def commit_merge(self, plan: MergePlan, merged: Optional[str]) -> None:
+        """Swap a finished merge into the manifest and remove the replaced files."""
+        with self._locked(".lock"):
+            manifest = self._read_manifest()
+            segments = [name for name in manifest["segments"] if name not in plan.inputs]
+            if merged is not None:
+                segments.insert(0, plan.output)
+            manifest["segments"] = segments
+            manifest["deleted_file_ids"] = sorted(set(manifest["deleted_file_ids"]) - set(plan.deleted_file_ids))
+            self._write_manifest(manifest)
+        for name in plan.inputs:
+            try:
+                os.remove(os.path.join(self.index_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def _plan_merge(self) -> Optional[MergePlan]:
+        self.refresh()
+        segments = list(self.segments.items())
+        # Segments holding deleted files get rewritten without them
+        inputs = {name for name, segment in segments if self.deleted_file_ids.intersection(segment.file_ids)}
+        if len(segments) > self.max_segments:
+            # Fold the smallest segments together, leaving large ones untouched
+            by_size = sorted(segments, key=lambda item: item[1].doc_count)
+            inputs.update(name for name, _ in by_size[:len(segments) - self.max_segments // 2])
+        if not inputs or (len(inputs) == 1 and not self.deleted_file_ids):
+            return None
+
+        applied = set()
+        for name in inputs:
+            applied.update(self.deleted_file_ids.intersection(self.segments[name].file_ids))
+        with self._locked(".lock"):
+            manifest = self._read_manifest()
+            output = self._next_name(manifest)
+            # Reserve the generation so appends during the merge don't reuse it
+            self._write_manifest(manifest)
+        return MergePlan(inputs=sorted(inputs), deleted_file_ids=sorted(applied), output=output)
+
+    def _next_name(self, manifest: dict) -> str:
+        manifest["generation"] += 1
+        return f"seg-{manifest['generation']:010d}{SEGMENT_SUFFIX}"
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(os.path.join(self.index_dir, MANIFEST))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.index_dir, MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"generation": 0, "segments": [], "deleted_file_ids": []}
+
+    def _write_manifest(self, manifest: dict) -> None:
+        path = os.path.join(self.index_dir, MANIFEST)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # A new inode on every write, so `refresh` notices even within one mtime tick
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _locked(self, name: str, blocking: bool = True, shared: bool = False) -> Iterator[None]:
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(os.path.join(self.index_dir, name), "a") as lock_file:
+            operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            fcntl.flock(lock_file, operation if blocking else operation | fcntl.LOCK_NB)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_stores: Optional[List[IndexStore]] = None
+
+
+def index_dirs() -> List[str]:
+    """Directories of the index shards, one per `settings.search_shards`."""
+    index_dir = settings.search_index_path or os.path.join(settings.local_storage_path, ".index")
+    if settings.search_shards <= 1:
+        return [index_dir]
+    return [os.path.join(index_dir, f"shard-{shard:02d}") for shard in range(settings.search_shards)]
+
+
+def shard_of(file_id: str, shards: int) -> int:
+    """The shard holding a file; stable across processes and restarts (unlike `hash`)."""
+    return zlib.crc32(file_id.encode("utf-8")) % shards
+
+
+def get_index_stores() -> List[IndexStore]:
+    """Return this process's view of every index shard, indexed by shard number."""
+    global _stores
+    if _stores is None:
+        _stores = [IndexStore(index_dir, settings.search_index_max_segments) for index_dir in index_dirs()]
+    return _stores
@@ -0,0 +1,106 @@
+"""
+Type-ahead suggestions over the transcript vocabulary.
+
+Keys are single terms and frequent two-word phrases, weighted by document
+frequency (the number of transcript segments containing them). They are
+kept in a sorted array, so the keys sharing a prefix are one contiguous
+slice found with two binary searches. Results for recently seen prefixes
+are cached until the next vocabulary change, which keeps the hot path of
+a search box (the same few short prefixes) to a dict lookup.
+
+The index is per process and in memory. It is small (one entry per distinct
+key) and `IndexService` builds it from the term and phrase tables of the
+on-disk index segments, so no transcript text is re-read to load it.
+"""
+import heapq
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from api.config import settings
+from api.search.analysis import tokenize
+
+# Sorts after every character a key can contain
+_PREFIX_END = "\U0010ffff"
+_CACHE_SIZE = 4096
+
+
+class SuggestIndex:
+    """Sorted-array prefix index of terms and frequent phrases."""
+
+    def __init__(self, phrase_min_df: int = 2):
+        self.phrase_min_df = phrase_min_df
+        self._keys: List[str] = []
+        self._weights: Dict[str, int] = {}  # Keys present in `_keys`
+        self._phrase_df: Dict[str, int] = {}  # Every bigram, including rare ones
+        self._cache: Dict[Tuple[str, int], List[Tuple[str, int]]] = {}
+        # Index segment paths whose counts are included; lives here so every
+        # IndexService in the process agrees on what is already counted
+        self.segments: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add_counts(self, term_dfs: Iterable[Tuple[str, int]], phrase_dfs: Iterable[Tuple[str, int]]) -> None:
+        """Add document frequencies, e.g. from an index segment's term and phrase tables."""
+        new_keys = []
+        for term, df in term_dfs:
+            weight = self._weights.get(term, 0)
+            if not weight:
+                new_keys.append(term)
+            self._weights[term] = weight + df
+        for phrase, df in phrase_dfs:
+            previous = self._phrase_df.get(phrase, 0)
+            self._phrase_df[phrase] = previous + df
+            if previous + df >= self.phrase_min_df:
+                if previous < self.phrase_min_df:
+                    new_keys.append(phrase)
+                self._weights[phrase] = previous + df
+
+        if len(new_keys) > 64:
+            # Bulk loads: one merge instead of many O(n) inserts
+            self._keys = sorted(self._keys + new_keys)
+        else:
+            for key in new_keys:
+                insort(self._keys, key)
+        self._cache.clear()
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """Return up to `limit` (key, document frequency) pairs starting with `prefix`."""
+        prefix = " ".join(term for term, _, _ in tokenize(prefix)) + (" " if prefix[-1:].isspace() else "")
+        if not prefix.strip():
+            return []
+
+        cache_key = (prefix, limit)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + _PREFIX_END, lo)
+        matches = self._keys[lo:hi]
+        if len(matches) > limit:
+            matches = heapq.nlargest(limit, matches, key=self._weights.__getitem__)
+        # Highest frequency first, then shorter and alphabetical
+        result = sorted(((key, self._weights[key]) for key in matches), key=lambda kw: (-kw[1], len(kw[0]), kw[0]))
+
+        if len(self._cache) >= _CACHE_SIZE:
+            self._cache.clear()
+        self._cache[cache_key] = result
+        return result
+
+
+_index: Optional[SuggestIndex] = None
+
+
+def get_suggest_index() -> SuggestIndex:
+    """Return this process's suggestion index."""
+    global _index
+    if _index is None:
+        _index = SuggestIndex(settings.suggest_phrase_min_df)
+    return _index
+
+
+def swap_suggest_index(index: SuggestIndex) -> None:
+    """Replace this process's index with a freshly built one."""
+    global _index
+    _index = index
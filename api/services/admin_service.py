@@ -1,18 +1,25 @@
-from api.config import settings
+import asyncio
 from api.services.database_service import DatabaseService
-import os
+from api.services.index_service import IndexService
+from api.services.upload_session_service import UploadSessionService
+from api.admission import get_controller
+from api.storage import get_storage
+from sqlalchemy.orm import Session
+from typing import Optional
 from datetime import datetime
 
 class AdminService:
     def __init__(self):
-        self.storage_path = settings.local_storage_path
+        self.storage = get_storage()
         self.db_service = DatabaseService()
+        self.index_service = IndexService()
+        self.upload_session_service = UploadSessionService()
     
-    async def list_all_files(self) -> list:
+    async def list_all_files(self, db: Optional[Session] = None) -> list:
         """List all uploaded files with their metadata."""
         try:
             # Query database for file metadata
-            db_files = await self.db_service.get_all_files()
+            db_files = await self.db_service.get_all_files(db=db)
             files = []
             
             for db_file in db_files:
@@ -31,25 +38,22 @@ class AdminService:
         except Exception as e:
             raise Exception(f"Error listing files: {str(e)}")
     
-    async def delete_file(self, file_id: str) -> dict:
+    async def delete_file(self, file_id: str, db: Optional[Session] = None) -> dict:
         """Delete a file and all associated data."""
         try:
             # Delete from database first
-            db_success = await self.db_service.delete_file(file_id)
+            db_success = await self.db_service.delete_file(file_id, db=db)
             
-            # Delete physical file
+            # Delete the media and everything derived from it: transcript,
+            # waveform peaks, compact transcription audio
             deleted = False
-            for ext in settings.allowed_audio_formats + settings.allowed_video_formats:
-                file_path = os.path.join(self.storage_path, f"{file_id}.{ext}")
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    deleted = True
-                    break
+            for stored in await self.storage.list(f"{file_id}."):
+                await self.storage.delete(stored.key)
+                deleted = True
             
-            # Also delete transcript file
-            transcript_path = os.path.join(self.storage_path, f"{file_id}.txt")
-            if os.path.exists(transcript_path):
-                os.remove(transcript_path)
+            if db_success:
+                # Tombstoned for every worker now; merging it out is left to the background sync
+                await self.index_service.remove_file(file_id)
             
             if not db_success and not deleted:
                 return {"success": False, "message": "File not found"}
@@ -89,15 +93,11 @@ class AdminService:
         """Get system statistics and health information."""
         try:
             # Count files in storage
-            file_count = 0
-            total_size = 0
-            
-            if os.path.exists(self.storage_path):
-                for filename in os.listdir(self.storage_path):
-                    file_path = os.path.join(self.storage_path, filename)
-                    if os.path.isfile(file_path):
-                        file_count += 1
-                        total_size += os.path.getsize(file_path)
+            stored = await self.storage.list()
+            file_count = len(stored)
+            total_size = sum(stored_object.size for stored_object in stored)
+            # Object storage backends scan their cache directory here
+            backend = await asyncio.to_thread(self.storage.describe)
             
             # TODO: Add database stats, search engine stats, etc.
             
@@ -106,7 +106,8 @@ class AdminService:
                     "total_files": file_count,
                     "total_size_bytes": total_size,
                     "total_size_mb": round(total_size / (1024 * 1024), 2),
-                    "storage_path": self.storage_path
+                    "storage_path": self.storage.location,
+                    "backend": backend
                 },
                 "database": {
                     "status": "connected",  # TODO: Check actual DB connection
@@ -119,7 +120,9 @@ class AdminService:
                 "system": {
                     "uptime": "unknown",  # TODO: Track application uptime
                     "version": "1.0.0"
-                }
+                },
+                # This worker process only
+                "admission": get_controller().snapshot()
             }
             
         except Exception as e:
@@ -132,12 +135,14 @@ class AdminService:
             # 1. Find files in storage without database records
             # 2. Find database records without physical files
             # 3. Clean up stale search index entries
+            expired_sessions = await asyncio.to_thread(self.upload_session_service.cleanup_expired_sessions)
             
             return {
                 "success": True,
                 "message": "Cleanup completed",
                 "orphaned_files_removed": 0,
-                "stale_records_removed": 0
+                "stale_records_removed": 0,
+                "expired_upload_sessions_removed": expired_sessions
             }
             
         except Exception as e:
@@ -1,143 +1,314 @@
 from sqlalchemy.orm import Session
-from api.db.database import get_db, AudioFile as DBAudioFile, Transcript as DBTranscript
+from api.db.database import unit_of_work, AudioFile as DBAudioFile, Transcript as DBTranscript
 from api.models.upload import AudioFile
 from api.models.search import SearchResult
-from typing import List, Optional
+from api.search.analysis import encode_term_offsets, query_terms
+from api.search.snippets import build_snippet
+from api.search.timings import align_word_timings, decode_word_timings, encode_word_timings
+from sqlalchemy import and_, func, or_, update
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+from contextlib import contextmanager
 from datetime import datetime
 import os
 
 class DatabaseService:
+    """Data access for audio files and transcripts.
+
+    Every method takes an optional `db` session. Pass the request- or
+    job-scoped session (see `api.db.database.get_db` / `unit_of_work`) to
+    share one connection and transaction across calls; the owner of that
+    session commits. Without one, the method runs in its own unit of work.
+    """
+
     def __init__(self):
         pass
     
-    async def create_audio_file(self, audio_file: AudioFile) -> bool:
+    @contextmanager
+    def _session(self, db: Optional[Session]) -> Iterator[Session]:
+        if db is not None:
+            yield db
+        else:
+            with unit_of_work() as owned:
+                yield owned
+    
+    async def create_audio_file(self, audio_file: AudioFile, db: Optional[Session] = None) -> bool:
         """Create a new audio file record in the database."""
         try:
-            db = next(get_db())
-            db_audio_file = DBAudioFile(
-                id=audio_file.id,
-                filename=audio_file.filename,
-                file_size=audio_file.file_size,
-                duration=audio_file.duration,
-                format=audio_file.format,
-                upload_time=audio_file.upload_time,
-                transcription_status=audio_file.transcription_status,
-                file_path=f"./uploads/{audio_file.id}.{audio_file.format}"
-            )
-            db.add(db_audio_file)
-            db.commit()
-            db.refresh(db_audio_file)
+            with self._session(db) as db:
+                db.add(DBAudioFile(
+                    id=audio_file.id,
+                    filename=audio_file.filename,
+                    file_size=audio_file.file_size,
+                    duration=audio_file.duration,
+                    sample_rate=audio_file.sample_rate,
+                    channels=audio_file.channels,
+                    bitrate=audio_file.bitrate,
+                    format=audio_file.format,
+                    upload_time=audio_file.upload_time,
+                    transcription_status=audio_file.transcription_status,
+                    file_path=f"./uploads/{audio_file.id}.{audio_file.format}"
+                ))
             return True
         except Exception as e:
             print(f"Error creating audio file record: {e}")
             return False
-        finally:
-            db.close()
     
-    async def get_audio_file(self, file_id: str) -> Optional[DBAudioFile]:
+    async def get_audio_file(self, file_id: str, db: Optional[Session] = None) -> Optional[DBAudioFile]:
         """Get an audio file record by ID."""
         try:
-            db = next(get_db())
-            return db.query(DBAudioFile).filter(DBAudioFile.id == file_id).first()
+            with self._session(db) as db:
+                # Served from the session's identity map when already loaded
+                return db.get(DBAudioFile, file_id)
         except Exception as e:
             print(f"Error getting audio file: {e}")
             return None
-        finally:
-            db.close()
     
-    async def update_transcription_status(self, file_id: str, status: str) -> bool:
+    async def update_transcription_status(self, file_id: str, status: str,
+                                          db: Optional[Session] = None) -> bool:
         """Update the transcription status of an audio file."""
         try:
-            db = next(get_db())
-            audio_file = db.query(DBAudioFile).filter(DBAudioFile.id == file_id).first()
-            if audio_file:
-                audio_file.transcription_status = status
-                db.commit()
-                return True
-            return False
+            with self._session(db) as db:
+                # Single UPDATE ... WHERE id = ?, no SELECT first
+                result = db.execute(
+                    update(DBAudioFile)
+                    .where(DBAudioFile.id == file_id)
+                    .values(transcription_status=status)
+                    .execution_options(synchronize_session=False)
+                )
+                return result.rowcount > 0
         except Exception as e:
             print(f"Error updating transcription status: {e}")
             return False
-        finally:
-            db.close()
     
     async def create_transcript_segment(self, file_id: str, segment_index: int, 
                                       start_time: float, end_time: float, 
-                                      text: str, confidence_score: float) -> bool:
+                                      text: str, confidence_score: float,
+                                      db: Optional[Session] = None) -> bool:
         """Create a transcript segment record."""
         try:
-            db = next(get_db())
-            transcript = DBTranscript(
-                file_id=file_id,
-                segment_index=segment_index,
-                start_time=start_time,
-                end_time=end_time,
-                text=text,
-                confidence_score=confidence_score,
-                created_at=datetime.utcnow()
-            )
-            db.add(transcript)
-            db.commit()
+            with self._session(db) as db:
+                db.add(DBTranscript(
+                    file_id=file_id,
+                    segment_index=segment_index,
+                    start_time=start_time,
+                    end_time=end_time,
+                    text=text,
+                    confidence_score=confidence_score,
+                    term_offsets=encode_term_offsets(text),
+                    # No word timestamps: interpolated across the segment
+                    word_timings=encode_word_timings(*align_word_timings(text, start_time, end_time), start_time),
+                    created_at=datetime.utcnow()
+                ))
             return True
         except Exception as e:
             print(f"Error creating transcript segment: {e}")
             return False
-        finally:
-            db.close()
     
-    async def search_transcripts(self, query: str, limit: int = 10, offset: int = 0) -> List[SearchResult]:
-        """Search through transcript segments."""
+    async def create_transcript_segments(self, file_id: str, segments: List[dict],
+                                         db: Optional[Session] = None) -> bool:
+        """Create all transcript segment records for a file in one transaction.
+
+        Each segment dict has segment_index, start_time, end_time, text,
+        confidence_score and optionally word_timings (see api.search.timings).
+        Term offsets are recorded for snippet highlighting.
+        """
         try:
-            db = next(get_db())
-            # Simple text search for now - can be enhanced with full-text search
-            results = db.query(DBTranscript, DBAudioFile).join(
-                DBAudioFile, DBTranscript.file_id == DBAudioFile.id
-            ).filter(
-                DBTranscript.text.ilike(f"%{query}%")
-            ).limit(limit).offset(offset).all()
-            
-            search_results = []
-            for transcript, audio_file in results:
-                search_results.append(SearchResult(
-                    file_id=transcript.file_id,
-                    filename=audio_file.filename,
-                    transcript_segment=transcript.text,
-                    start_time=transcript.start_time,
-                    end_time=transcript.end_time,
-                    confidence_score=transcript.confidence_score or 0.0,
-                    upload_time=audio_file.upload_time
-                ))
+            with self._session(db) as db:
+                created_at = datetime.utcnow()
+                db.add_all([
+                    DBTranscript(
+                        file_id=file_id,
+                        segment_index=segment["segment_index"],
+                        start_time=segment["start_time"],
+                        end_time=segment["end_time"],
+                        text=segment["text"],
+                        confidence_score=segment["confidence_score"],
+                        term_offsets=encode_term_offsets(segment["text"]),
+                        word_timings=segment.get("word_timings"),
+                        created_at=created_at
+                    )
+                    for segment in segments
+                ])
+            return True
+        except Exception as e:
+            print(f"Error creating transcript segments: {e}")
+            return False
+    
+    async def get_transcript_segments(self, file_id: str, start_time: Optional[float] = None,
+                                      end_time: Optional[float] = None,
+                                      after: Optional[Tuple[float, int]] = None,
+                                      limit: int = 200,
+                                      db: Optional[Session] = None) -> List[DBTranscript]:
+        """Get transcript segments overlapping a time window, ordered by start time.
+
+        `after` is a (start_time, segment_index) keyset cursor. Every bound is
+        on `start_time` so the (file_id, start_time) index serves the scan.
+        """
+        try:
+            with self._session(db) as db:
+                query = db.query(DBTranscript).filter(DBTranscript.file_id == file_id)
+                if start_time is not None:
+                    # Segments are sequential, so the one in progress at start_time
+                    # is the last to start at or before it
+                    first_start = db.query(func.max(DBTranscript.start_time)).filter(
+                        DBTranscript.file_id == file_id,
+                        DBTranscript.start_time <= start_time
+                    ).scalar_subquery()
+                    query = query.filter(
+                        DBTranscript.start_time >= func.coalesce(first_start, start_time),
+                        DBTranscript.end_time > start_time
+                    )
+                if end_time is not None:
+                    query = query.filter(DBTranscript.start_time < end_time)
+                if after is not None:
+                    query = query.filter(or_(
+                        DBTranscript.start_time > after[0],
+                        and_(DBTranscript.start_time == after[0], DBTranscript.segment_index > after[1])
+                    ))
+                return query.order_by(
+                    DBTranscript.start_time, DBTranscript.segment_index
+                ).limit(limit).all()
+        except Exception as e:
+            print(f"Error getting transcript segments: {e}")
+            return []
+    
+    def search_transcripts(self, query: str, limit: int = 10, offset: int = 0,
+                           snippet_chars: int = 0, db: Optional[Session] = None) -> List[SearchResult]:
+        """Search through transcript segments.
+
+        Each result carries a snippet of at most `snippet_chars` characters
+        around the best match, built from the term offsets stored at index time.
+        Synchronous, so a search batch can run it on its worker thread.
+        """
+        try:
+            with self._session(db) as db:
+                # Simple text search for now - can be enhanced with full-text search
+                results = db.query(DBTranscript, DBAudioFile).join(
+                    DBAudioFile, DBTranscript.file_id == DBAudioFile.id
+                ).filter(
+                    DBTranscript.text.ilike(f"%{query}%")
+                ).limit(limit).offset(offset).all()
             
-            return search_results
+            terms = query_terms(query)
+            return [
+                _to_search_result(transcript, audio_file, terms, snippet_chars)
+                for transcript, audio_file in results
+            ]
         except Exception as e:
             print(f"Error searching transcripts: {e}")
             return []
-        finally:
-            db.close()
     
-    async def get_all_files(self) -> List[DBAudioFile]:
+    def get_phrase_results(self, hits: List[Tuple[int, int, int]], terms: List[str],
+                           snippet_chars: int = 0, db: Optional[Session] = None) -> List[SearchResult]:
+        """Load search results for positional index hits, keeping their order.
+
+        Each hit is (segment_id, first_position, last_position); the match
+        times come from the segment's word timings at those token positions.
+        Synchronous, like `search_transcripts`.
+        """
+        try:
+            with self._session(db) as db:
+                rows = db.query(DBTranscript, DBAudioFile).join(
+                    DBAudioFile, DBTranscript.file_id == DBAudioFile.id
+                ).filter(
+                    DBTranscript.id.in_([segment_id for segment_id, _, _ in hits])
+                ).all()
+            
+            by_id = {transcript.id: (transcript, audio_file) for transcript, audio_file in rows}
+            # Hits for segments deleted since the index last synced are dropped
+            return [
+                _to_search_result(*by_id[segment_id], terms, snippet_chars, (first, last))
+                for segment_id, first, last in hits if segment_id in by_id
+            ]
+        except Exception as e:
+            print(f"Error getting phrase results: {e}")
+            return []
+    
+    async def get_all_files(self, db: Optional[Session] = None) -> List[DBAudioFile]:
         """Get all audio files."""
         try:
-            db = next(get_db())
-            return db.query(DBAudioFile).all()
+            with self._session(db) as db:
+                return db.query(DBAudioFile).all()
         except Exception as e:
             print(f"Error getting all files: {e}")
             return []
-        finally:
-            db.close()
     
-    async def delete_file(self, file_id: str) -> bool:
+    async def delete_file(self, file_id: str, db: Optional[Session] = None) -> bool:
         """Delete a file and all associated data."""
         try:
-            db = next(get_db())
-            # Delete transcript segments first
-            db.query(DBTranscript).filter(DBTranscript.file_id == file_id).delete()
-            # Delete audio file record
-            db.query(DBAudioFile).filter(DBAudioFile.id == file_id).delete()
-            db.commit()
-            return True
+            with self._session(db) as db:
+                # Delete transcript segments first
+                db.query(DBTranscript).filter(
+                    DBTranscript.file_id == file_id
+                ).delete(synchronize_session=False)
+                # Delete audio file record
+                deleted = db.query(DBAudioFile).filter(
+                    DBAudioFile.id == file_id
+                ).delete(synchronize_session=False)
+            return deleted > 0
         except Exception as e:
             print(f"Error deleting file: {e}")
             return False
-        finally:
-            db.close()
+    
+    async def get_transcribed_file_ids(self, db: Optional[Session] = None) -> Optional[Set[str]]:
+        """Get the IDs of all files whose transcription completed; None if the lookup failed."""
+        try:
+            with self._session(db) as db:
+                rows = db.query(DBAudioFile.id).filter(
+                    DBAudioFile.transcription_status == "completed"
+                ).all()
+            return {row.id for row in rows}
+        except Exception as e:
+            print(f"Error getting transcribed file IDs: {e}")
+            # Not an empty set: callers must not mistake a failure for "no files"
+            return None
+    
+    async def get_segment_texts(self, file_ids: Iterable[str], batch_size: int = 500,
+                                db: Optional[Session] = None) -> List[Tuple[int, str, str]]:
+        """Get (segment_id, file_id, text) for every transcript segment of the given files."""
+        try:
+            file_ids = list(file_ids)
+            rows = []
+            with self._session(db) as db:
+                # Bounded IN lists; some backends cap bound parameters
+                for i in range(0, len(file_ids), batch_size):
+                    rows.extend(db.query(DBTranscript.id, DBTranscript.file_id, DBTranscript.text).filter(
+                        DBTranscript.file_id.in_(file_ids[i:i + batch_size])
+                    ).order_by(DBTranscript.file_id, DBTranscript.segment_index).all())
+            return [(row.id, row.file_id, row.text) for row in rows]
+        except Exception as e:
+            print(f"Error getting segment texts: {e}")
+            return []
+
+
+def _to_search_result(transcript: DBTranscript, audio_file: DBAudioFile, terms: List[str],
+                      snippet_chars: int, positions: Optional[Tuple[int, int]] = None) -> SearchResult:
+    """Build a result with a snippet and, where known, the time the match is spoken.
+
+    `positions` are the first and last matched token positions; without them
+    the position of the first highlighted term, stored with its offsets, is
+    used. Nothing here re-tokenizes the segment text.
+    """
+    snippet = build_snippet(transcript.text, transcript.term_offsets, terms, snippet_chars)
+    if positions is None and snippet.positions and snippet.positions[0] is not None:
+        positions = (snippet.positions[0], snippet.positions[0])
+    match_start = match_end = None
+    if positions is not None:
+        # Stored per token, so a position indexes them directly
+        starts, ends = decode_word_timings(transcript.word_timings, transcript.start_time)
+        if positions[1] < len(starts):
+            match_start, match_end = starts[positions[0]], ends[positions[1]]
+    
+    return SearchResult(
+        file_id=transcript.file_id,
+        filename=audio_file.filename,
+        transcript_segment=snippet.text,
+        snippet_offset=snippet.offset,
+        highlights=snippet.highlights,
+        start_time=transcript.start_time,
+        end_time=transcript.end_time,
+        match_start_time=match_start,
+        match_end_time=match_end,
+        confidence_score=transcript.confidence_score or 0.0,
+        upload_time=audio_file.upload_time
+    )
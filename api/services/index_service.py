@@ -0,0 +1,146 @@
+from api.config import settings
+from api.services.database_service import DatabaseService
+from api.processing import executor
+from api.search.analysis import tokenize
+from api.search.segments import IndexSegment, merge_segments
+from api.search.store import IndexStore, get_index_stores, shard_of
+from api.search.suggest import SuggestIndex, swap_suggest_index, get_suggest_index
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import os
+
+class IndexService:
+    """Keeps the on-disk search index in step with the database, and this process in step with it.
+
+    The positional index lives in immutable, memory-mapped segment files
+    shared by all workers (see `api.search.store`), partitioned into shards
+    by file ID. The ingesting worker appends a file to its shard as a delta
+    segment as soon as its segments are committed, and deleting a file
+    tombstones it; both are visible to every worker on its next refresh.
+    Every worker also syncs periodically, which maps segments written by other
+    workers, appends transcribed files that were never indexed and, in one
+    worker at a time, merges segments in the processing pool. The suggestion
+    index stays in memory and is loaded from the segments' term tables, never
+    from the database.
+    """
+
+    def __init__(self):
+        self.db_service = DatabaseService()
+        self.stores: List[IndexStore] = get_index_stores()
+        self._sync_task: Optional[asyncio.Task] = None
+
+    async def add_file(self, file_id: str) -> None:
+        """Index the segments of a newly transcribed file."""
+        try:
+            await self._append([file_id])
+            await self._refresh()
+        except Exception as e:
+            print(f"Error indexing file {file_id}: {e}")
+
+    async def remove_file(self, file_id: str) -> None:
+        """Hide a deleted file from queries at once; a background merge drops it from disk."""
+        try:
+            store = self.stores[shard_of(file_id, len(self.stores))]
+            await asyncio.to_thread(store.delete_files, [file_id])
+            await self._refresh()
+        except Exception as e:
+            print(f"Error removing file {file_id} from the index: {e}")
+
+    async def sync(self) -> None:
+        """Follow the index, append transcribed files missing from it and merge segments.
+
+        Deletions are never inferred here: a file only leaves the index
+        through `remove_file`, so a failed or partial lookup can't empty it.
+        """
+        try:
+            await self._refresh()
+            file_ids = await self.db_service.get_transcribed_file_ids()
+            if file_ids is not None:
+                indexed = set()
+                for store in self.stores:
+                    indexed |= store.file_ids | store.deleted_file_ids
+                new_ids = file_ids - indexed
+                if new_ids:
+                    await self._append(new_ids)
+                    await self._refresh()
+            for store in self.stores:
+                await self._maybe_merge(store)
+        except Exception as e:
+            print(f"Error syncing search index: {e}")
+
+    async def start(self) -> None:
+        """Map the on-disk index, load suggestions from it and keep both synced in the background."""
+        try:
+            await self._refresh()
+        except Exception as e:
+            print(f"Error loading search index: {e}")
+        await self.sync()
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_forever())
+
+    async def stop(self) -> None:
+        """Stop background syncing."""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+    async def _sync_forever(self) -> None:
+        while True:
+            await asyncio.sleep(settings.search_index_refresh_seconds)
+            await self.sync()
+
+    async def _append(self, file_ids: Iterable[str]) -> None:
+        segments = await self.db_service.get_segment_texts(file_ids)
+        docs = defaultdict(list)
+        for segment_id, file_id, text in segments:
+            docs[shard_of(file_id, len(self.stores))].append(
+                (segment_id, file_id, [term for term, _, _ in tokenize(text)])
+            )
+        for shard, shard_docs in docs.items():
+            await asyncio.to_thread(self.stores[shard].append, shard_docs)
+
+    async def _refresh(self) -> None:
+        """Follow the manifest and update the suggestion index to match."""
+        segments = {}
+        for store in self.stores:
+            store.refresh()
+            # Keyed by path: segment names repeat across shards
+            segments.update((segment.path, segment) for segment in store.segments.values())
+        suggest_index = get_suggest_index()
+        if suggest_index.segments - segments.keys():
+            # Segments were merged away; their counts can't be subtracted, so reload
+            swap_suggest_index(await asyncio.to_thread(self._build_suggest, segments))
+            return
+
+        # No await from here on: another refresh can't count the same segment twice
+        for path in segments.keys() - suggest_index.segments:
+            suggest_index.add_counts(segments[path].term_dfs(), segments[path].phrase_dfs())
+            suggest_index.segments.add(path)
+
+    async def _maybe_merge(self, store: IndexStore) -> None:
+        with store.merging() as plan:
+            if plan is None:
+                return
+            loop = asyncio.get_running_loop()
+            merged = await loop.run_in_executor(
+                executor.get_executor(),
+                merge_segments,
+                [os.path.join(store.index_dir, name) for name in plan.inputs],
+                plan.deleted_file_ids,
+                os.path.join(store.index_dir, plan.output),
+            )
+            await asyncio.to_thread(store.commit_merge, plan, merged)
+        await self._refresh()
+
+    @staticmethod
+    def _build_suggest(segments: Dict[str, IndexSegment]) -> SuggestIndex:
+        suggest_index = SuggestIndex(settings.suggest_phrase_min_df)
+        for path, segment in segments.items():
+            suggest_index.add_counts(segment.term_dfs(), segment.phrase_dfs())
+            suggest_index.segments.add(path)
+        return suggest_index
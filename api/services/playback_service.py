@@ -1,20 +1,28 @@
 from api.models.playback import PlaybackRequest, PlaybackResponse
 from api.config import settings
+from api.processing import waveform
+from api.services.database_service import DatabaseService
+from api.storage import StoredObject, get_storage
+from sqlalchemy.orm import Session
+from datetime import timezone
+import aiofiles
+import base64
+import json
+import math
 import os
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, Optional, Union
 
 class PlaybackService:
     def __init__(self):
-        self.storage_path = settings.local_storage_path
+        self.storage = get_storage()
+        self.db_service = DatabaseService()
     
-    async def get_playback_info(self, request: PlaybackRequest) -> PlaybackResponse:
+    async def get_playback_info(self, request: PlaybackRequest, db: Optional[Session] = None) -> PlaybackResponse:
         """Get playback information for an audio file or segment."""
         try:
-            # TODO: Get file info from database
-            # For now, just check if file exists
-            file_path = self._get_file_path(request.file_id)
+            audio_file = await self.db_service.get_audio_file(request.file_id, db=db)
             
-            if not os.path.exists(file_path):
+            if audio_file is None:
                 return PlaybackResponse(
                     success=False,
                     file_id=request.file_id,
@@ -30,6 +38,7 @@ class PlaybackService:
                 file_id=request.file_id,
                 start_time=request.start_time,
                 end_time=request.end_time,
+                duration=audio_file.duration,
                 message="Playback info retrieved successfully"
             )
             
@@ -40,65 +49,91 @@ class PlaybackService:
                 message=f"Error retrieving playback info: {str(e)}"
             )
     
-    async def stream_audio(
+    async def get_stream_source(
         self,
         file_id: str,
         start_time: Optional[float] = None,
         end_time: Optional[float] = None,
-    ) -> AsyncGenerator[bytes, None]:
-        """Stream audio file or segment."""
-        file_path = self._get_file_path(file_id)
-        
-        if not os.path.exists(file_path):
-            raise FileNotFoundError("Audio file not found")
-        
+        db: Optional[Session] = None,
+    ) -> Union[str, StoredObject]:
+        """Resolve the audio to stream for a file or segment.
+
+        Returns a local path when the bytes are on this host (local storage or
+        a cache hit); `MediaFileResponse` serves it with byte ranges and
+        zero-copy sends. Otherwise returns the stored object, which
+        `StoredObjectResponse` streams with ranged reads, and starts copying
+        it into the local cache so the next play is served from disk.
+        """
         # TODO: Implement audio segmentation if start_time/end_time provided
         # For now, just stream the entire file
-        
-        chunk_size = 8192
-        with open(file_path, 'rb') as audio_file:
-            while True:
-                chunk = audio_file.read(chunk_size)
-                if not chunk:
-                    break
-                yield chunk
+        return await self._media_source(file_id, settings.allowed_audio_formats, db=db)
     
-    async def get_audio_info(self, file_id: str) -> dict:
-        """Get audio file information and metadata."""
+    async def get_audio_info(self, file_id: str, db: Optional[Session] = None) -> dict:
+        """Get audio file information and metadata.
+
+        Served entirely from the database; duration, sample rate, channels
+        and bitrate are probed from the media headers at upload time.
+        """
         try:
-            file_path = self._get_file_path(file_id)
+            audio_file = await self.db_service.get_audio_file(file_id, db=db)
             
-            if not os.path.exists(file_path):
+            if audio_file is None:
                 raise FileNotFoundError("Audio file not found")
             
-            # TODO: Get metadata from database and audio file analysis
-            file_stat = os.stat(file_path)
-            
             return {
                 "file_id": file_id,
-                "file_size": file_stat.st_size,
-                "created_at": file_stat.st_ctime,
-                "format": file_path.split('.')[-1],
-                # TODO: Add duration, bitrate, etc. from audio analysis
+                "file_size": audio_file.file_size,
+                "created_at": audio_file.upload_time.replace(tzinfo=timezone.utc).timestamp() if audio_file.upload_time else None,
+                "format": audio_file.format,
+                "duration": audio_file.duration,
+                "sample_rate": audio_file.sample_rate,
+                "channels": audio_file.channels,
+                "bitrate": audio_file.bitrate,
             }
             
         except Exception as e:
             raise Exception(f"Error getting audio info: {str(e)}")
     
-    async def get_transcript(self, file_id: str) -> dict:
-        """Return transcript text for a given file.
+    async def get_transcript(
+        self,
+        file_id: str,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = 200,
+        db: Optional[Session] = None,
+    ) -> dict:
+        """Return transcript segments for a file, optionally within a time window.
 
-        I return a simple placeholder if no sidecar transcript file is found.
-        If a sidecar file named `{file_id}.txt` exists alongside the audio in
-        the storage path, I will return its contents as the transcript.
+        Segments come from the `Transcript` table, `limit` at a time; pass the
+        returned `next_cursor` back to fetch the following page. `transcript`
+        joins the text of the returned segments. Files without segment rows
+        fall back to the `{file_id}.txt` sidecar or a placeholder.
         """
+        after = self._decode_cursor(cursor) if cursor else None
         try:
+            rows = await self.db_service.get_transcript_segments(
+                file_id, start_time, end_time, after, limit + 1, db=db
+            )
+            if rows:
+                page = rows[:limit]
+                next_cursor = self._encode_cursor(page[-1]) if len(rows) > limit else None
+                return {
+                    "file_id": file_id,
+                    "transcript": " ".join(row.text for row in page),
+                    "segments": [self._segment_to_dict(row) for row in page],
+                    "next_cursor": next_cursor,
+                }
+
+            if start_time is not None or end_time is not None or cursor:
+                return {"file_id": file_id, "transcript": "", "segments": [], "next_cursor": None}
+
             # Try to find a sidecar transcript file
-            transcript_path = os.path.join(self.storage_path, f"{file_id}.txt")
-            if os.path.exists(transcript_path):
-                with open(transcript_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                return {"file_id": file_id, "transcript": content}
+            try:
+                content = (await self.storage.get_bytes(f"{file_id}.txt")).decode("utf-8")
+                return {"file_id": file_id, "transcript": content, "segments": [], "next_cursor": None}
+            except FileNotFoundError:
+                pass
 
             # Fallback placeholder text until transcription pipeline is wired
             placeholder = (
@@ -106,29 +141,134 @@ class PlaybackService:
                 "is not yet connected. Once processing completes, this will "
                 "display the full text of the audio."
             )
-            return {"file_id": file_id, "transcript": placeholder}
+            return {"file_id": file_id, "transcript": placeholder, "segments": [], "next_cursor": None}
 
         except Exception as exc:
             raise Exception(f"Error getting transcript: {str(exc)}")
 
-    def _get_file_path(self, file_id: str) -> str:
-        """Get the file path for a given file ID."""
-        # TODO: This should query the database to get the actual filename
-        # For now, assume files are stored as {file_id}.{extension}
-        for ext in settings.allowed_audio_formats:
-            potential_path = os.path.join(self.storage_path, f"{file_id}.{ext}")
-            if os.path.exists(potential_path):
-                return potential_path
-        
-        # Fallback to mp3 if not found
-        return os.path.join(self.storage_path, f"{file_id}.mp3")
-
-    async def get_original_media_path(self, file_id: str) -> str:
-        """Return the path to the stored original media (audio or video)."""
-        # Try audio first
-        for ext in settings.allowed_audio_formats + settings.allowed_video_formats:
-            potential_path = os.path.join(self.storage_path, f"{file_id}.{ext}")
-            if os.path.exists(potential_path):
-                return potential_path
-        # If still not found, raise
+    def stream_transcript(
+        self,
+        file_id: str,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        cursor: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> AsyncGenerator[bytes, None]:
+        """Stream transcript segments as NDJSON, one segment per line.
+
+        Rows are fetched in keyset-paginated batches, so memory stays bounded
+        however long the recording is. The cursor is validated up front so a
+        bad one fails before the response starts.
+        """
+        after = self._decode_cursor(cursor) if cursor else None
+        return self._iter_transcript_ndjson(file_id, start_time, end_time, after, batch_size)
+
+    async def _iter_transcript_ndjson(self, file_id, start_time, end_time, after, batch_size):
+        while True:
+            rows = await self.db_service.get_transcript_segments(
+                file_id, start_time, end_time, after, batch_size
+            )
+            if not rows:
+                break
+            yield "".join(
+                json.dumps(self._segment_to_dict(row)) + "\n" for row in rows
+            ).encode("utf-8")
+            if len(rows) < batch_size:
+                break
+            after = (rows[-1].start_time, rows[-1].segment_index)
+
+    @staticmethod
+    def _segment_to_dict(row) -> dict:
+        return {
+            "segment_index": row.segment_index,
+            "start_time": row.start_time,
+            "end_time": row.end_time,
+            "text": row.text,
+            "confidence_score": row.confidence_score,
+        }
+
+    @staticmethod
+    def _encode_cursor(row) -> str:
+        """Encode a (start_time, segment_index) keyset position as an opaque token."""
+        raw = f"{row.start_time!r}:{row.segment_index}".encode("ascii")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple:
+        try:
+            start_time, segment_index = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").split(":")
+            return float(start_time), int(segment_index)
+        except Exception:
+            raise ValueError("Invalid transcript cursor")
+
+    async def get_waveform(
+        self,
+        file_id: str,
+        level: int = 0,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+    ) -> dict:
+        """Return packed waveform peaks for a zoom level and time window.
+
+        `data` holds interleaved int8 (min, max, rms) triples, one per bucket,
+        exactly as stored in the `.peaks` file built at ingest.
+        """
+        try:
+            # Peaks files are small; a local copy keeps windowed reads cheap
+            peaks_path = await self.storage.fetch(waveform.peaks_key(file_id))
+        except FileNotFoundError:
+            raise FileNotFoundError("Waveform not found")
+
+        async with aiofiles.open(peaks_path, "rb") as f:
+            header = waveform.parse_header(await f.read(waveform.header_size()))
+            if not 0 <= level < len(header.levels):
+                raise ValueError(f"level must be between 0 and {len(header.levels) - 1}")
+            selected = header.levels[level]
+
+            seconds_per_bucket = selected.samples_per_bucket / header.sample_rate
+            start_bucket = 0
+            end_bucket = selected.bucket_count
+            if start_time is not None:
+                start_bucket = min(max(int(start_time / seconds_per_bucket), 0), selected.bucket_count)
+            if end_time is not None:
+                end_bucket = min(max(math.ceil(round(end_time / seconds_per_bucket, 6)), start_bucket), selected.bucket_count)
+
+            await f.seek(selected.data_offset + start_bucket * waveform.BYTES_PER_BUCKET)
+            data = await f.read((end_bucket - start_bucket) * waveform.BYTES_PER_BUCKET)
+
+        file_stat = os.stat(peaks_path)
+        return {
+            "data": data,
+            "sample_rate": header.sample_rate,
+            "samples_per_bucket": selected.samples_per_bucket,
+            "levels": [lvl.samples_per_bucket for lvl in header.levels],
+            "start_bucket": start_bucket,
+            "bucket_count": end_bucket - start_bucket,
+            "etag": f'"{file_id}-{file_stat.st_mtime_ns:x}-{level}-{start_bucket}-{end_bucket}"',
+        }
+
+    async def get_original_media_source(self, file_id: str, db: Optional[Session] = None) -> Union[str, StoredObject]:
+        """Resolve the stored original media (audio or video), like `get_stream_source`."""
+        return await self._media_source(
+            file_id, settings.allowed_audio_formats + settings.allowed_video_formats, db=db
+        )
+
+    async def _media_source(self, file_id: str, formats: list,
+                            db: Optional[Session] = None) -> Union[str, StoredObject]:
+        for key in await self._media_keys(file_id, formats, db=db):
+            path = await self.storage.local_path(key)
+            if path is not None:
+                return path
+            stored = await self.storage.stat(key)
+            if stored is not None:
+                self.storage.prefetch(key)
+                return stored
         raise FileNotFoundError("Media file not found")
+
+    async def _media_keys(self, file_id: str, formats: list, db: Optional[Session] = None) -> list:
+        """Candidate storage keys for a file's media, most likely first."""
+        # The format recorded at upload names the object; probe the rest for files without a record
+        audio_file = await self.db_service.get_audio_file(file_id, db=db)
+        if audio_file is not None and audio_file.format in formats:
+            return [f"{file_id}.{audio_file.format}"]
+        return [f"{file_id}.{ext}" for ext in formats]
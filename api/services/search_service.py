@@ -1,6 +1,17 @@
-from api.models.search import SearchRequest, SearchResponse, SearchResult
+from api.models.search import (
+    SearchRequest, SearchResponse, SearchResult, BatchSearchRequest, BatchSearchResponse,
+    Suggestion, SuggestResponse
+)
+from api.config import settings
 from api.services.database_service import DatabaseService
+from api.db.database import session_scope
+from api.search.positional import PhraseHit, PhraseQuery, PositionalIndex, get_positional_index, parse_phrase_query
+from api.search.shards import get_shard_pool
+from api.search.suggest import get_suggest_index
+from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Dict, List, Optional, Union
+import asyncio
 import time
 
 class SearchService:
@@ -8,36 +19,118 @@ class SearchService:
         # TODO: Initialize ElasticSearch and ChromaDB connections
         self.db_service = DatabaseService()
     
-    async def search(self, search_request: SearchRequest) -> SearchResponse:
+    async def search(self, search_request: SearchRequest, db: Optional[Session] = None) -> SearchResponse:
         """Search through transcribed audio content."""
         start_time = time.time()
         
         try:
-            # Search in database
-            results = await self.db_service.search_transcripts(
-                search_request.query, 
-                search_request.limit, 
-                search_request.offset
-            )
-            
-            took_ms = int((time.time() - start_time) * 1000)
-            
-            return SearchResponse(
-                success=True,
-                results=results,
-                total_count=len(results),
-                query=search_request.query,
-                took_ms=took_ms
-            )
+            phrase = parse_phrase_query(search_request.query)
+            hits = None
+            if phrase is not None:
+                # "exact phrase" or "near terms"~N: positional index, word-accurate times
+                if settings.search_shards > 1:
+                    # Scattered to the shard processes, merged by global rank
+                    hits = await get_shard_pool().search(phrase, _top_k(search_request))
+                else:
+                    # CPU-bound over every segment; keep it off the event loop
+                    hits = await asyncio.to_thread(get_positional_index().search, phrase, _top_k(search_request))
+            results = self._results(search_request, phrase, hits, db)
+            return _response(search_request, results, start_time)
             
         except Exception as e:
-            return SearchResponse(
-                success=False,
-                results=[],
-                total_count=0,
-                query=search_request.query,
-                took_ms=int((time.time() - start_time) * 1000)
+            return _response(search_request, [], start_time, success=False)
+    
+    async def search_batch(self, batch_request: BatchSearchRequest) -> BatchSearchResponse:
+        """Run several searches on one connection and snapshot.
+
+        Identical requests are executed once and share a response. All
+        queries run in a single session, so the batch pays for one connection
+        checkout and, on PostgreSQL, reads one REPEATABLE READ snapshot;
+        phrase queries likewise share one view of the search index. The
+        whole batch runs on one worker thread, off the event loop.
+        """
+        start_time = time.time()
+        
+        unique_requests = {}
+        for request in batch_request.requests:
+            unique_requests.setdefault(request.model_dump_json(), request)
+        
+        index = None
+        shard_hits = {}
+        if settings.search_shards > 1:
+            # The shard processes do the matching; only the DB work is left for the thread
+            phrases = {
+                key: phrase for key, phrase in
+                ((key, parse_phrase_query(request.query)) for key, request in unique_requests.items())
+                if phrase is not None
+            }
+            results = await asyncio.gather(*(
+                get_shard_pool().search(phrase, _top_k(unique_requests[key])) for key, phrase in phrases.items()
+            ), return_exceptions=True)
+            shard_hits = dict(zip(phrases, results))
+        else:
+            index = get_positional_index().snapshot()
+        
+        responses = await asyncio.to_thread(self._search_batch, unique_requests, index, shard_hits)
+        
+        return BatchSearchResponse(
+            success=all(response.success for response in responses.values()),
+            responses=[responses[request.model_dump_json()] for request in batch_request.requests],
+            unique_queries=len(unique_requests),
+            took_ms=int((time.time() - start_time) * 1000)
+        )
+    
+    def _search_batch(self, requests: Dict[str, SearchRequest], index: Optional[PositionalIndex],
+                      shard_hits: Dict[str, Union[List[PhraseHit], BaseException]]) -> Dict[str, SearchResponse]:
+        """Answer each request in one session; runs on a worker thread."""
+        responses = {}
+        with session_scope() as db:
+            if db.get_bind().dialect.name == "postgresql":
+                db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            for key, request in requests.items():
+                start_time = time.time()
+                try:
+                    phrase = parse_phrase_query(request.query)
+                    hits = None
+                    if phrase is not None:
+                        hits = index.search(phrase, _top_k(request)) if index is not None else shard_hits[key]
+                        if isinstance(hits, BaseException):
+                            raise hits
+                    responses[key] = _response(request, self._results(request, phrase, hits, db), start_time)
+                except Exception:
+                    responses[key] = _response(request, [], start_time, success=False)
+        return responses
+    
+    def _results(self, request: SearchRequest, phrase: Optional[PhraseQuery],
+                 hits: Optional[List[PhraseHit]], db: Optional[Session]) -> List[SearchResult]:
+        if phrase is not None:
+            return self.db_service.get_phrase_results(
+                hits[request.offset:],
+                phrase.terms,
+                request.snippet_chars,
+                db=db
             )
+        # Search in database
+        return self.db_service.search_transcripts(
+            request.query,
+            request.limit,
+            request.offset,
+            request.snippet_chars,
+            db=db
+        )
+    
+    async def suggest(self, prefix: str, limit: int = 10) -> SuggestResponse:
+        """Complete a partial query from the in-memory vocabulary; never touches the database."""
+        start_time = time.perf_counter()
+        suggestions = [
+            Suggestion(text=text, weight=weight)
+            for text, weight in get_suggest_index().suggest(prefix, limit)
+        ]
+        return SuggestResponse(
+            prefix=prefix,
+            suggestions=suggestions,
+            took_ms=round((time.perf_counter() - start_time) * 1000, 3)
+        )
     
     async def _search_elasticsearch(self, query: str, filters: dict) -> list:
         """Search in ElasticSearch (placeholder)."""
@@ -48,3 +141,19 @@ class SearchService:
         """Search in vector database (ChromaDB) (placeholder)."""
         # TODO: Implement vector similarity search
         pass
+
+
+def _top_k(request: SearchRequest) -> int:
+    """Hits to rank so that the requested page is complete."""
+    return request.offset + request.limit
+
+
+def _response(request: SearchRequest, results: List[SearchResult], start_time: float,
+              success: bool = True) -> SearchResponse:
+    return SearchResponse(
+        success=success,
+        results=results,
+        total_count=len(results),
+        query=request.query,
+        took_ms=int((time.time() - start_time) * 1000)
+    )
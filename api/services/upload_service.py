@@ -2,17 +2,27 @@ from fastapi import UploadFile, BackgroundTasks
 from api.models.upload import UploadResponse, AudioFile
 from api.config import settings
 from api.services.database_service import DatabaseService
+from api.services.index_service import IndexService
+from api.db.database import unit_of_work
+from sqlalchemy.orm import Session
+from api.processing import compaction, executor, probe, waveform
+from api.admission import get_controller
+from api.storage import get_storage
+from api.search.timings import align_word_timings, encode_word_timings
+from bisect import bisect_left
+import asyncio
+import math
 import uuid
 from datetime import datetime
 import os
 import aiofiles
-from openai import OpenAI
 
 class UploadService:
     def __init__(self):
-        self.storage_path = settings.local_storage_path
+        self.storage = get_storage()
         self.db_service = DatabaseService()
-        os.makedirs(self.storage_path, exist_ok=True)
+        self.index_service = IndexService()
+        self._openai_client = None
     
     async def process_upload(self, file: UploadFile, background_tasks: BackgroundTasks | None = None) -> UploadResponse:
         """Process uploaded audio file."""
@@ -26,18 +36,47 @@ class UploadService:
                 
             file_extension = file.filename.split('.')[-1].lower()
             stored_filename = f"{file_id}.{file_extension}"
-            file_path = os.path.join(self.storage_path, stored_filename)
+            file_path = self.storage.staging_path(stored_filename)
             
             # Save file to storage
             async with aiofiles.open(file_path, 'wb') as f:
                 content = await file.read()
                 await f.write(content)
+            await self.storage.put_file(stored_filename, file_path)
+            
+            return await self.ingest_stored_file(
+                file_id, file.filename, len(content), background_tasks
+            )
+            
+        except Exception as e:
+            return UploadResponse(
+                success=False,
+                message=f"Upload failed: {str(e)}"
+            )
+    
+    async def ingest_stored_file(self, file_id: str, filename: str, file_size: int,
+                                 background_tasks: BackgroundTasks | None = None) -> UploadResponse:
+        """Register a file already stored as `{file_id}.{ext}` and start its processing.
+
+        Shared by single-request uploads and finalized resumable upload sessions.
+        """
+        try:
+            file_extension = filename.split('.')[-1].lower()
+            media_key = f"{file_id}.{file_extension}"
+            file_path = await self.storage.fetch(media_key)
+            
+            # Read duration etc. from the media headers (a few small reads)
+            media_info = await asyncio.to_thread(probe.probe_media, file_path, file_extension)
             
             # Create audio file record
             audio_file = AudioFile(
                 id=file_id,
-                filename=file.filename,
-                file_size=len(content),
+                filename=filename,
+                file_size=file_size,
+                duration=media_info.duration,
+                sample_rate=media_info.sample_rate,
+                channels=media_info.channels,
+                bitrate=media_info.bitrate,
                 format=file_extension,
                 upload_time=datetime.utcnow(),
                 transcription_status="pending"
@@ -46,15 +85,21 @@ class UploadService:
             # Save to database
             await self.db_service.create_audio_file(audio_file)
             
+            # Precompute waveform peaks for the player (audio and video)
+            if background_tasks is not None:
+                background_tasks.add_task(self._build_waveform, file_id, media_key)
+            else:
+                await self._build_waveform(file_id, media_key)
+            
             # Trigger async transcription job
             # Only attempt transcription for audio formats; skip for videos
             is_audio = file_extension in settings.allowed_audio_formats
             if is_audio:
                 if background_tasks is not None:
-                    background_tasks.add_task(self._trigger_transcription, file_id, file_path)
+                    background_tasks.add_task(self._trigger_transcription, file_id, media_key)
                 else:
                     # Fallback: fire-and-forget (not ideal; prefer BackgroundTasks)
-                    await self._trigger_transcription(file_id, file_path)
+                    await self._trigger_transcription(file_id, media_key)
             
             return UploadResponse(
                 success=True,
@@ -69,51 +114,163 @@ class UploadService:
                 message=f"Upload failed: {str(e)}"
             )
     
-    async def get_upload_status(self, file_id: str) -> dict:
+    async def get_upload_status(self, file_id: str, db: Session | None = None) -> dict:
         """Get the processing status of an uploaded file."""
-        # TODO: Implement database lookup for file status
+        audio_file = await self.db_service.get_audio_file(file_id, db=db)
+        if audio_file is None:
+            raise FileNotFoundError("File not found")
+        messages = {
+            "pending": "File is queued for processing",
+            "processing": "File is being transcribed",
+            "completed": "Transcription completed",
+            "failed": "Transcription failed",
+        }
         return {
             "file_id": file_id,
-            "status": "pending",  # This would come from database
-            "message": "File is queued for processing"
+            "status": audio_file.transcription_status,
+            "message": messages.get(audio_file.transcription_status, "")
         }
     
-    async def _trigger_transcription(self, file_id: str, file_path: str):
-        """Transcribe audio via Whisper API and store sidecar .txt transcript."""
+    async def _trigger_transcription(self, file_id: str, media_key: str):
+        """Transcribe audio via Whisper API, store timed segments and a sidecar .txt transcript."""
         try:
             if not settings.openai_api_key:
                 # No API key set; skip transcription but create placeholder
-                transcript_path = os.path.join(self.storage_path, f"{file_id}.txt")
-                async with aiofiles.open(transcript_path, "w", encoding="utf-8") as f:
-                    await f.write(
-                        "Transcription skipped: OPENAI_API_KEY not configured."
-                    )
+                await self.storage.put_bytes(
+                    f"{file_id}.txt",
+                    "Transcription skipped: OPENAI_API_KEY not configured.".encode("utf-8")
+                )
                 return
 
-            client = OpenAI(api_key=settings.openai_api_key)
-
-            # Open file in binary for streaming to API
-            # Note: open synchronously; upload handled by OpenAI client
-            with open(file_path, "rb") as audio_file:
-                # Handle optional language parameter
-                transcription_kwargs = {
-                    "model": settings.whisper_model,
-                    "file": audio_file,
-                    "response_format": "text",
-                }
-                if settings.whisper_language:
-                    transcription_kwargs["language"] = settings.whisper_language
-                    
-                transcription = client.audio.transcriptions.create(**transcription_kwargs)
+            # Queue behind interactive requests; at most transcription_max_concurrency at once
+            async with get_controller().slot("transcription"):
+                await self.db_service.update_transcription_status(file_id, "processing")
+                client = await asyncio.to_thread(self._get_openai_client)
+
+                # Send the compact 16kHz mono artifact when we can build one
+                file_path = await self.storage.fetch(media_key)
+                source_path = await self._prepare_transcription_source(file_id, file_path)
+
+                # Open file in binary for streaming to API
+                # Note: open synchronously; upload handled by OpenAI client
+                with open(source_path, "rb") as audio_file:
+                    # Handle optional language parameter
+                    # verbose_json includes per-segment timings
+                    transcription_kwargs = {
+                        "model": settings.whisper_model,
+                        "file": audio_file,
+                        "response_format": "verbose_json",
+                        # Word timestamps let phrase hits seek to the exact word
+                        "timestamp_granularities": ["word", "segment"],
+                    }
+                    if settings.whisper_language:
+                        transcription_kwargs["language"] = settings.whisper_language
+                        
+                    # Blocking HTTP call; keep it off the event loop
+                    transcription = await asyncio.to_thread(
+                        client.audio.transcriptions.create, **transcription_kwargs
+                    )
 
+            # Persist timed segments for windowed transcript reads and search
+            words = [
+                (_field(word, "word"), float(_field(word, "start")), float(_field(word, "end")))
+                for word in getattr(transcription, "words", None) or []
+            ]
+            word_starts = [word[1] for word in words]
+            segments = []
+            for index, segment in enumerate(getattr(transcription, "segments", None) or []):
+                start, end = float(_field(segment, "start")), float(_field(segment, "end"))
+                text = _field(segment, "text").strip()
+                timings = align_word_timings(text, start, end, _segment_words(words, word_starts, start, end))
+                segments.append({
+                    "segment_index": index,
+                    "start_time": start,
+                    "end_time": end,
+                    "text": text,
+                    "confidence_score": _segment_confidence(segment),
+                    "word_timings": encode_word_timings(*timings, start),
+                })
             # Persist transcript to sidecar .txt next to audio
-            transcript_text = transcription if isinstance(transcription, str) else str(transcription)
-            transcript_path = os.path.join(self.storage_path, f"{file_id}.txt")
-            async with aiofiles.open(transcript_path, "w", encoding="utf-8") as f:
-                await f.write(transcript_text)
+            transcript_text = transcription if isinstance(transcription, str) else transcription.text
+            await self.storage.put_bytes(f"{file_id}.txt", transcript_text.encode("utf-8"))
+
+            # Segments and the completed status land in one transaction
+            with unit_of_work() as db:
+                if segments:
+                    await self.db_service.create_transcript_segments(file_id, segments, db=db)
+                await self.db_service.update_transcription_status(file_id, "completed", db=db)
+            # Searchable (and suggestible) right away in this worker
+            await self.index_service.add_file(file_id)
 
         except Exception as exc:
             # Persist error message for visibility in the UI
-            transcript_path = os.path.join(self.storage_path, f"{file_id}.txt")
-            async with aiofiles.open(transcript_path, "w", encoding="utf-8") as f:
-                await f.write(f"Transcription failed: {str(exc)}")
+            await self.db_service.update_transcription_status(file_id, "failed")
+            await self.storage.put_bytes(f"{file_id}.txt", f"Transcription failed: {str(exc)}".encode("utf-8"))
+
+    async def _prepare_transcription_source(self, file_id: str, file_path: str) -> str:
+        """Return the compact artifact to transcribe, building it once in the process pool."""
+        if not settings.compaction_enabled:
+            return file_path
+
+        try:
+            cached = await self.storage.list(compaction.artifact_prefix(file_id))
+            if cached:
+                return await self.storage.fetch(cached[0].key)
+
+            loop = asyncio.get_running_loop()
+            artifact = await loop.run_in_executor(
+                executor.get_executor(),
+                compaction.compact_audio,
+                file_path,
+                self.storage.staging_path(file_id),
+            )
+            if artifact is None:
+                return file_path
+            return await self.storage.put_file(os.path.basename(artifact), artifact)
+        except Exception as exc:
+            # Compaction is an optimisation; fall back to the original bytes
+            print(f"Audio compaction failed for {file_id}: {exc}")
+            return file_path
+
+    async def _build_waveform(self, file_id: str, media_key: str):
+        """Compute waveform peaks in the processing pool and store them as `{file_id}.peaks`."""
+        try:
+            file_path = await self.storage.fetch(media_key)
+            peaks_key = waveform.peaks_key(file_id)
+            loop = asyncio.get_running_loop()
+            peaks_path = await loop.run_in_executor(
+                executor.get_executor(),
+                waveform.build_waveform,
+                file_path,
+                self.storage.staging_path(peaks_key),
+            )
+            if peaks_path:
+                await self.storage.put_file(peaks_key, peaks_path)
+        except Exception as exc:
+            print(f"Waveform generation failed for {file_id}: {exc}")
+
+    def _get_openai_client(self):
+        """Return the shared OpenAI client, importing the SDK on first use."""
+        # The SDK is the heaviest import in the app; keep it off the startup path
+        if self._openai_client is None:
+            from openai import OpenAI
+            self._openai_client = OpenAI(api_key=settings.openai_api_key)
+        return self._openai_client
+
+
+def _field(segment, name: str):
+    """Read a Whisper segment field; the SDK returns dicts or objects depending on version."""
+    return segment[name] if isinstance(segment, dict) else getattr(segment, name)
+
+
+def _segment_words(words: list, word_starts: list, start: float, end: float) -> list:
+    """Whisper's word list is per file and sorted; slice out the words that start in a segment."""
+    return words[bisect_left(word_starts, start):bisect_left(word_starts, end)]
+
+
+def _segment_confidence(segment) -> float:
+    """Approximate a 0-1 confidence from the segment's average token log-probability."""
+    try:
+        return math.exp(float(_field(segment, "avg_logprob")))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return 0.0
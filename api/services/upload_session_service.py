@@ -0,0 +1,223 @@
+from fastapi import BackgroundTasks
+from api.models.upload import UploadSessionRequest, UploadSessionResponse, UploadResponse
+from api.config import settings
+from api.services.upload_service import UploadService
+from api.storage import get_storage
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+import aiofiles
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+MAX_PARTS = 10000
+COPY_BUFFER_SIZE = 1024 * 1024
+
+class UploadSessionService:
+    """Resumable, parallel chunked uploads.
+
+    Session state lives on disk under `{storage}/.sessions/{session_id}/`, so
+    any worker process can serve any part:
+
+    - `session.json`: filename, size and part layout
+    - `data`: the target file, pre-sized; each part is written at its offset
+    - `parts/{n}`: marker holding the SHA-256 of a verified part; parts are
+      staged next to it and copied into `data` only once verified
+
+    Verified parts are copied straight into place, so finalizing is a
+    rename (or, with a bucket, one multipart upload) rather than a re-read
+    and concatenation.
+    """
+
+    def __init__(self):
+        self.storage_path = settings.local_storage_path
+        self.sessions_path = os.path.join(self.storage_path, ".sessions")
+        self.storage = get_storage()
+        self.upload_service = UploadService()
+
+    async def create_session(self, request: UploadSessionRequest) -> UploadSessionResponse:
+        """Create an upload session and pre-size its target file."""
+        part_size = request.part_size or settings.upload_part_size
+        if request.file_size <= 0 or part_size <= 0:
+            raise ValueError("file_size and part_size must be positive")
+        if -(-request.file_size // part_size) > MAX_PARTS:
+            raise ValueError(f"part_size too small; at most {MAX_PARTS} parts are allowed")
+
+        # Opportunistic GC keeps abandoned sessions from piling up
+        await asyncio.to_thread(self.cleanup_expired_sessions)
+
+        session_id = str(uuid.uuid4())
+        session_dir = self._session_dir(session_id)
+        os.makedirs(os.path.join(session_dir, "parts"))
+        meta = {
+            "filename": request.filename,
+            "file_size": request.file_size,
+            "part_size": part_size,
+            "total_parts": -(-request.file_size // part_size),
+        }
+        async with aiofiles.open(os.path.join(session_dir, "session.json"), "w") as f:
+            await f.write(json.dumps(meta))
+        # Sparse on most filesystems; parts fill it in any order
+        await asyncio.to_thread(os.truncate, self._create_data_file(session_dir), request.file_size)
+
+        return self._to_response(session_id, meta, [])
+
+    async def get_session(self, session_id: str) -> UploadSessionResponse:
+        """Return a session with the parts received so far."""
+        meta = await self._load_meta(session_id)
+        return self._to_response(session_id, meta, self._received_parts(session_id))
+
+    async def write_part(self, session_id: str, part_number: int, chunks: AsyncIterator[bytes],
+                         checksum: str) -> dict:
+        """Stream one part into place and verify its length and SHA-256.
+
+        Parts are numbered from 0. A part that fails verification is not
+        marked as received, so the client can simply PUT it again.
+        """
+        meta = await self._load_meta(session_id)
+        if not 0 <= part_number < meta["total_parts"]:
+            raise ValueError(f"part_number must be between 0 and {meta['total_parts'] - 1}")
+
+        offset = part_number * meta["part_size"]
+        expected_length = min(meta["part_size"], meta["file_size"] - offset)
+        session_dir = self._session_dir(session_id)
+        digest = hashlib.sha256()
+        written = 0
+
+        # Staged on its own first, so a bad or concurrent upload of this part
+        # never touches bytes already accepted into `data`
+        staged_path = os.path.join(session_dir, "parts", f".{part_number}.{uuid.uuid4().hex}")
+        try:
+            async with aiofiles.open(staged_path, "wb") as f:
+                async for chunk in chunks:
+                    if written + len(chunk) > expected_length:
+                        raise ValueError(f"Part {part_number} is larger than {expected_length} bytes")
+                    await f.write(chunk)
+                    digest.update(chunk)
+                    written += len(chunk)
+
+            if written != expected_length:
+                raise ValueError(f"Part {part_number} has {written} bytes, expected {expected_length}")
+            if digest.hexdigest() != checksum.lower():
+                raise ValueError(f"Checksum mismatch for part {part_number}")
+
+            await asyncio.to_thread(
+                self._commit_part, session_dir, part_number, offset, staged_path, digest.hexdigest()
+            )
+        finally:
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+        # Session activity keeps it clear of garbage collection
+        os.utime(os.path.join(session_dir, "session.json"))
+
+        return {"session_id": session_id, "part_number": part_number, "size": written,
+                "sha256": digest.hexdigest()}
+
+    async def complete_session(self, session_id: str,
+                               background_tasks: BackgroundTasks | None = None) -> UploadResponse:
+        """Move the assembled file into storage and hand it to the normal ingest path."""
+        meta = await self._load_meta(session_id)
+        received = set(self._received_parts(session_id))
+        missing = [n for n in range(meta["total_parts"]) if n not in received]
+        if missing:
+            raise ValueError(f"Missing parts: {missing}")
+
+        file_extension = meta["filename"].split('.')[-1].lower()
+        session_dir = self._session_dir(session_id)
+        # A rename locally; a parallel multipart upload to a bucket
+        await self.storage.put_file(f"{session_id}.{file_extension}", os.path.join(session_dir, "data"))
+        await asyncio.to_thread(shutil.rmtree, session_dir, True)
+
+        return await self.upload_service.ingest_stored_file(
+            session_id, meta["filename"], meta["file_size"], background_tasks
+        )
+
+    async def abort_session(self, session_id: str) -> dict:
+        """Discard a session and everything uploaded to it."""
+        await self._load_meta(session_id)
+        await asyncio.to_thread(shutil.rmtree, self._session_dir(session_id), True)
+        return {"success": True, "message": f"Upload session {session_id} aborted"}
+
+    def cleanup_expired_sessions(self) -> int:
+        """Remove sessions idle for longer than the TTL. Returns how many were removed."""
+        cutoff = time.time() - settings.upload_session_ttl_hours * 3600
+        removed = 0
+        if not os.path.isdir(self.sessions_path):
+            return removed
+        for session_id in os.listdir(self.sessions_path):
+            session_dir = os.path.join(self.sessions_path, session_id)
+            meta_path = os.path.join(session_dir, "session.json")
+            try:
+                last_activity = os.path.getmtime(meta_path if os.path.exists(meta_path) else session_dir)
+            except OSError:
+                continue
+            if last_activity < cutoff:
+                shutil.rmtree(session_dir, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def _commit_part(self, session_dir: str, part_number: int, offset: int, staged_path: str,
+                     sha256: str) -> None:
+        """Copy a verified part into `data` and mark it received, one writer per part at a time."""
+        marker_path = os.path.join(session_dir, "parts", str(part_number))
+        # flock rather than an asyncio lock: any worker process may serve any part
+        with open(os.path.join(session_dir, "parts", f".{part_number}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(marker_path, "r") as f:
+                        if f.read() == sha256:
+                            return  # A retry of the part already in place
+                    # Not received while its bytes are being replaced
+                    os.remove(marker_path)
+                except FileNotFoundError:
+                    pass
+                with open(staged_path, "rb") as src, open(os.path.join(session_dir, "data"), "r+b") as dst:
+                    dst.seek(offset)
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                with open(marker_path, "w") as f:
+                    f.write(sha256)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _session_dir(self, session_id: str) -> str:
+        # Session IDs become paths; only accept canonical UUIDs
+        if str(uuid.UUID(session_id)) != session_id:
+            raise ValueError("Invalid session ID")
+        return os.path.join(self.sessions_path, session_id)
+
+    def _create_data_file(self, session_dir: str) -> str:
+        data_path = os.path.join(session_dir, "data")
+        open(data_path, "wb").close()
+        return data_path
+
+    async def _load_meta(self, session_id: str) -> dict:
+        meta_path = os.path.join(self._session_dir(session_id), "session.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError("Upload session not found")
+        async with aiofiles.open(meta_path, "r") as f:
+            return json.loads(await f.read())
+
+    def _received_parts(self, session_id: str) -> list:
+        parts_dir = os.path.join(self._session_dir(session_id), "parts")
+        return sorted(int(name) for name in os.listdir(parts_dir) if name.isdigit())
+
+    def _to_response(self, session_id: str, meta: dict, received: list) -> UploadSessionResponse:
+        received_set = set(received)
+        meta_path = os.path.join(self._session_dir(session_id), "session.json")
+        last_activity = datetime.utcfromtimestamp(os.path.getmtime(meta_path))
+        return UploadSessionResponse(
+            session_id=session_id,
+            filename=meta["filename"],
+            file_size=meta["file_size"],
+            part_size=meta["part_size"],
+            total_parts=meta["total_parts"],
+            received_parts=received,
+            missing_parts=[n for n in range(meta["total_parts"]) if n not in received_set],
+            expires_at=last_activity + timedelta(hours=settings.upload_session_ttl_hours)
+        )
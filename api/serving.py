@@ -0,0 +1,52 @@
+"""
+Multi-process production serving.
+
+The app is imported once in the gunicorn master (`preload_app`), so workers
+fork with the code already loaded and share its memory pages. Each worker
+then resets fork-unsafe state (`lifecycle.after_fork`), runs the ASGI
+lifespan startup (`lifecycle.warmup`) before accepting connections, and on
+SIGTERM stops accepting and waits up to `graceful_timeout` for in-flight
+requests, streams and background tasks.
+"""
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from api import lifecycle
+from api.config import settings
+
+
+class EchoFindWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "auto",
+        "http": "auto",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": settings.graceful_timeout,
+    }
+
+
+def post_fork(server, worker) -> None:
+    lifecycle.after_fork()
+
+
+class EchoFindApplication(BaseApplication):
+    def __init__(self, app_path: str = "api.main:app"):
+        self.app_path = app_path
+        super().__init__()
+
+    def load_config(self) -> None:
+        self.cfg.set("bind", f"{settings.api_host}:{settings.api_port}")
+        self.cfg.set("workers", settings.api_workers)
+        self.cfg.set("worker_class", EchoFindWorker)
+        self.cfg.set("preload_app", True)
+        self.cfg.set("graceful_timeout", settings.graceful_timeout)
+        self.cfg.set("post_fork", post_fork)
+
+    def load(self):
+        module_name, _, attribute = self.app_path.partition(":")
+        module = __import__(module_name, fromlist=[attribute])
+        return getattr(module, attribute)
+
+
+def run_workers() -> None:
+    """Serve the API with `settings.api_workers` preloaded worker processes."""
+    EchoFindApplication().run()
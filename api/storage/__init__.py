@@ -0,0 +1,58 @@
+"""
+Media storage backends, selected by `settings.storage_type`:
+
+- "local": files in `local_storage_path` (the default)
+- "s3" / "gcs": an S3-compatible bucket; `local_storage_path` then holds a
+  size-bounded cache of hot media plus working files (uploads in progress,
+  the search index)
+"""
+import os
+from typing import Optional
+
+from api.config import settings
+from api.storage.base import Storage, StoredObject
+
+_storage: Optional[Storage] = None
+
+GCS_ENDPOINT_URL = "https://storage.googleapis.com"
+
+
+def get_storage() -> Storage:
+    """Return this process's storage backend, creating it on first use."""
+    global _storage
+    if _storage is None:
+        _storage = _create_storage()
+    return _storage
+
+
+def _create_storage() -> Storage:
+    if settings.storage_type == "local":
+        from api.storage.local import LocalStorage
+        return LocalStorage(settings.local_storage_path)
+
+    if settings.storage_type not in ("s3", "gcs"):
+        raise ValueError(f"Unknown storage_type: {settings.storage_type}")
+    from api.storage.cache import DiskCache
+    from api.storage.object_store import ObjectStorage
+
+    bucket = settings.storage_bucket_name or settings.gcs_bucket_name
+    if not bucket:
+        raise ValueError(f"storage_type {settings.storage_type!r} needs storage_bucket_name")
+    endpoint_url = settings.storage_endpoint_url
+    if endpoint_url is None and settings.storage_type == "gcs":
+        # GCS speaks the S3 XML API with HMAC keys
+        endpoint_url = GCS_ENDPOINT_URL
+    return ObjectStorage(
+        bucket,
+        DiskCache(os.path.join(settings.local_storage_path, ".cache"), settings.storage_cache_max_bytes),
+        os.path.join(settings.local_storage_path, ".staging"),
+        endpoint_url=endpoint_url,
+        region=settings.storage_region,
+        access_key_id=settings.storage_access_key_id,
+        secret_access_key=settings.storage_secret_access_key,
+        part_size=settings.storage_part_size,
+        concurrency=settings.storage_transfer_concurrency,
+    )
+
+
+__all__ = ["Storage", "StoredObject", "get_storage"]
@@ -0,0 +1,81 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    mtime: float  # Seconds since the epoch
+
+
+class Storage(ABC):
+    """Where uploaded media and its derived files live.
+
+    Objects are addressed by flat keys named after the file ID:
+    `{file_id}.{ext}` for the original, `{file_id}.txt`, `{file_id}.peaks`
+    and so on. Missing objects raise `FileNotFoundError`, as files would.
+
+    Processing (probing, compaction, waveforms) and zero-copy streaming need
+    real files, so backends also hand out local paths: `staging_path` for a
+    file about to be stored, `local_path` for a copy already on this host
+    and `fetch` to make one.
+    """
+
+    location: str  # Shown in admin stats
+
+    @abstractmethod
+    def staging_path(self, key: str) -> str:
+        """Local path to write a new file at before storing it with `put_file`."""
+
+    @abstractmethod
+    async def put_file(self, key: str, source_path: str) -> str:
+        """Store a local file under `key`, moving it. Returns a local path to its contents."""
+
+    @abstractmethod
+    async def put_bytes(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def get_bytes(self, key: str) -> bytes:
+        ...
+
+    async def get_range(self, key: str, start: int, length: int) -> bytes:
+        """Read `length` bytes from `start`."""
+        return b"".join([chunk async for chunk in self.iter_range(key, start, length)])
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int, length: int, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """Stream `length` bytes from `start` in chunks of at most `chunk_size`."""
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def list(self, prefix: str = "") -> List[StoredObject]:
+        ...
+
+    @abstractmethod
+    async def local_path(self, key: str) -> Optional[str]:
+        """Path of a complete copy on this host, if there is one; never downloads."""
+
+    @abstractmethod
+    async def fetch(self, key: str) -> str:
+        """Path of a complete copy on this host, downloading it first if needed."""
+
+    def prefetch(self, key: str) -> None:
+        """Start copying an object to this host in the background, if it isn't already."""
+
+    def describe(self) -> dict:
+        return {"type": type(self).__name__, "location": self.location}
+
+
+def check_key(key: str) -> str:
+    """Keys become file names; reject anything that could escape the storage directory."""
+    if not key or key.startswith(".") or "/" in key or "\\" in key or "\0" in key:
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return key
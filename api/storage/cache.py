@@ -0,0 +1,91 @@
+"""
+Size-bounded local disk cache of stored objects.
+
+Entries are plain files named after their key, so cache hits stream with
+`MediaFileResponse` and zero-copy sends like local storage does. The
+directory is shared by every worker on the host:
+
+- Recency is the file's atime, set explicitly on every hit (so `noatime`
+  and `relatime` mounts don't matter). mtime stays the object's
+  last-modified time.
+- Whoever adds an entry evicts least recently used files until the total
+  fits `max_bytes`. A reader that already opened an evicted file keeps
+  reading it; the space is freed when it closes.
+"""
+import os
+import time
+from typing import Optional, Tuple
+
+from api.storage.base import check_key
+
+
+class DiskCache:
+    """LRU cache of whole objects in one directory."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, check_key(key))
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached copy's path and mark it recently used, or None on a miss."""
+        path = self.path(key)
+        try:
+            file_stat = os.stat(path)
+            os.utime(path, (time.time(), file_stat.st_mtime))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def add(self, key: str, source_path: str, mtime: Optional[float] = None) -> str:
+        """Move a complete local file into the cache; returns its cached path."""
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(key)
+        os.replace(source_path, path)
+        os.utime(path, (time.time(), mtime if mtime is not None else os.stat(path).st_mtime))
+        self._evict(keep=path)
+        return path
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def usage(self) -> Tuple[int, int]:
+        """(entry count, total bytes)."""
+        entries = self._entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def _evict(self, keep: str) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        # Oldest access first; the entry just added always stays
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _entries(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        with os.scandir(self.root) as scan:
+            for entry in scan:
+                # Dot-files are never entries (keys cannot start with a dot)
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                try:
+                    entry_stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, entry_stat.st_size, entry_stat.st_atime))
+        return entries
@@ -0,0 +1,88 @@
+import asyncio
+import os
+from typing import AsyncIterator, List, Optional
+
+import aiofiles
+
+from api.storage.base import Storage, StoredObject, check_key
+
+
+class LocalStorage(Storage):
+    """Objects are files in one directory; staging happens in place."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.location = root
+
+    def staging_path(self, key: str) -> str:
+        return os.path.join(self.root, check_key(key))
+
+    async def put_file(self, key: str, source_path: str) -> str:
+        path = self.staging_path(key)
+        if os.path.abspath(source_path) != os.path.abspath(path):
+            os.replace(source_path, path)
+        return path
+
+    async def put_bytes(self, key: str, data: bytes) -> None:
+        async with aiofiles.open(self.staging_path(key), "wb") as f:
+            await f.write(data)
+
+    async def get_bytes(self, key: str) -> bytes:
+        async with aiofiles.open(self.staging_path(key), "rb") as f:
+            return await f.read()
+
+    def iter_range(self, key: str, start: int, length: int,
+                   chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        return iter_file_range(self.staging_path(key), start, length, chunk_size)
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            file_stat = await asyncio.to_thread(os.stat, self.staging_path(key))
+        except FileNotFoundError:
+            return None
+        return StoredObject(key, file_stat.st_size, file_stat.st_mtime)
+
+    async def delete(self, key: str) -> None:
+        try:
+            os.remove(self.staging_path(key))
+        except FileNotFoundError:
+            pass
+
+    async def list(self, prefix: str = "") -> List[StoredObject]:
+        return await asyncio.to_thread(self._list, prefix)
+
+    async def local_path(self, key: str) -> Optional[str]:
+        path = self.staging_path(key)
+        return path if os.path.isfile(path) else None
+
+    async def fetch(self, key: str) -> str:
+        path = await self.local_path(key)
+        if path is None:
+            raise FileNotFoundError(f"No stored object {key}")
+        return path
+
+    def _list(self, prefix: str) -> List[StoredObject]:
+        if not os.path.isdir(self.root):
+            return []
+        objects = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                # Dot-entries are working state (index, sessions), not objects
+                if entry.name.startswith(".") or not entry.name.startswith(prefix) or not entry.is_file():
+                    continue
+                entry_stat = entry.stat()
+                objects.append(StoredObject(entry.name, entry_stat.st_size, entry_stat.st_mtime))
+        return sorted(objects)
+
+
+async def iter_file_range(path: str, start: int, length: int, chunk_size: int) -> AsyncIterator[bytes]:
+    """Stream `length` bytes of a local file from `start`."""
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
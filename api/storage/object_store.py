@@ -0,0 +1,224 @@
+"""
+S3-compatible object storage with a local cache of hot media.
+
+Works with AWS S3, GCS through its XML API (HMAC keys), MinIO and fake
+servers such as moto's, selected by `storage_endpoint_url`. boto3 is
+imported on first use.
+
+- Uploads larger than `part_size` are multipart, with up to `concurrency`
+  parts in flight; downloads fetch ranges in parallel the same way.
+- Ranged reads stream a slice of an object without downloading the rest,
+  which lets playback start on a cache miss.
+- Whole objects are copied into a `DiskCache` on first full use (upload,
+  processing or a playback miss), so popular recordings are served from
+  local disk with zero-copy sends while the bulk stays in the bucket.
+"""
+import asyncio
+import os
+import threading
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiofiles
+
+from api.storage.base import Storage, StoredObject, check_key
+from api.storage.cache import DiskCache
+from api.storage.local import iter_file_range
+
+_NOT_FOUND_CODES = {"404", "NoSuchKey", "NotFound"}
+
+
+class ObjectStorage(Storage):
+    """Objects in a bucket, with whole-object copies in a local LRU cache."""
+
+    def __init__(self, bucket: str, cache: DiskCache, staging_dir: str,
+                 endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None,
+                 part_size: int = 16 * 1024 * 1024, concurrency: int = 8):
+        self.bucket = bucket
+        self.cache = cache
+        self.staging_dir = staging_dir
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self.location = f"s3://{bucket}"
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._fetches: Dict[str, asyncio.Task] = {}
+
+    def staging_path(self, key: str) -> str:
+        os.makedirs(self.staging_dir, exist_ok=True)
+        return os.path.join(self.staging_dir, check_key(key))
+
+    async def put_file(self, key: str, source_path: str) -> str:
+        check_key(key)
+        await asyncio.to_thread(
+            self._get_client().upload_file, source_path, self.bucket, key, Config=self._transfer_config()
+        )
+        # Just uploaded, so likely to be processed and played next. Adding
+        # evicts, which scans the cache directory
+        return await asyncio.to_thread(self.cache.add, key, source_path)
+
+    async def put_bytes(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._get_client().put_object, Bucket=self.bucket, Key=check_key(key), Body=data)
+        self.cache.discard(key)
+
+    async def get_bytes(self, key: str) -> bytes:
+        path = self.cache.get(key)
+        if path is not None:
+            async with aiofiles.open(path, "rb") as f:
+                return await f.read()
+        response = await asyncio.to_thread(self._call, "get_object", key)
+        try:
+            return await asyncio.to_thread(response["Body"].read)
+        finally:
+            response["Body"].close()
+
+    async def iter_range(self, key: str, start: int, length: int,
+                         chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        path = self.cache.get(key)
+        if path is not None:
+            async for chunk in iter_file_range(path, start, length, chunk_size):
+                yield chunk
+            return
+        if length <= 0:
+            return
+
+        # One ranged GET, read incrementally so memory stays at one chunk
+        response = await asyncio.to_thread(self._call, "get_object", key, Range=f"bytes={start}-{start + length - 1}")
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        path = self.cache.get(key)
+        if path is not None:
+            # Cached copies carry the object's size and last-modified time
+            file_stat = os.stat(path)
+            return StoredObject(key, file_stat.st_size, file_stat.st_mtime)
+        try:
+            head = await asyncio.to_thread(self._call, "head_object", key)
+        except FileNotFoundError:
+            return None
+        return StoredObject(key, head["ContentLength"], head["LastModified"].timestamp())
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._get_client().delete_object, Bucket=self.bucket, Key=check_key(key))
+        self.cache.discard(key)
+
+    async def list(self, prefix: str = "") -> List[StoredObject]:
+        return await asyncio.to_thread(self._list, prefix)
+
+    async def local_path(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    async def fetch(self, key: str) -> str:
+        path = self.cache.get(key)
+        if path is not None:
+            return path
+        # Shielded: one caller giving up doesn't abort the download for the others
+        return await asyncio.shield(self._start_fetch(key))
+
+    def prefetch(self, key: str) -> None:
+        if key in self._fetches or os.path.exists(self.cache.path(key)):
+            return
+        self._start_fetch(key).add_done_callback(_report_prefetch)
+
+    def describe(self) -> dict:
+        entries, cached_bytes = self.cache.usage()
+        return {
+            "type": type(self).__name__,
+            "location": self.location,
+            "endpoint_url": self.endpoint_url,
+            "cache": {
+                "path": self.cache.root,
+                "entries": entries,
+                "bytes": cached_bytes,
+                "max_bytes": self.cache.max_bytes,
+            },
+        }
+
+    def _start_fetch(self, key: str) -> asyncio.Task:
+        task = self._fetches.get(key)
+        if task is None:
+            # Concurrent requests for one object share a single download
+            task = asyncio.ensure_future(asyncio.to_thread(self._download, key))
+            self._fetches[key] = task
+            task.add_done_callback(lambda _: self._fetches.pop(key, None))
+        return task
+
+    def _download(self, key: str) -> str:
+        head = self._call("head_object", key)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        # Dot-prefixed and unique, so it never collides with staged uploads
+        part_path = os.path.join(self.staging_dir, f".{check_key(key)}.{uuid.uuid4().hex}.part")
+        try:
+            self._get_client().download_file(self.bucket, key, part_path, Config=self._transfer_config())
+            return self.cache.add(key, part_path, mtime=head["LastModified"].timestamp())
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def _list(self, prefix: str) -> List[StoredObject]:
+        paginator = self._get_client().get_paginator("list_objects_v2")
+        objects = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                objects.append(StoredObject(item["Key"], item["Size"], item["LastModified"].timestamp()))
+        return objects
+
+    def _call(self, operation: str, key: str, **kwargs) -> dict:
+        """Run a single-object client call, mapping a missing object to FileNotFoundError."""
+        try:
+            return getattr(self._get_client(), operation)(Bucket=self.bucket, Key=check_key(key), **kwargs)
+        except Exception as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(f"No stored object {key}") from e
+            raise
+
+    def _transfer_config(self):
+        from boto3.s3.transfer import TransferConfig
+        return TransferConfig(
+            multipart_threshold=self.part_size,
+            multipart_chunksize=self.part_size,
+            max_concurrency=self.concurrency,
+        )
+
+    def _get_client(self):
+        """Return the shared S3 client, importing boto3 on first use."""
+        # boto3 takes hundreds of ms to import; keep it off the startup path
+        with self._client_lock:
+            if self._client is None:
+                import boto3
+                from botocore.config import Config
+
+                # A session per storage: boto3's default session isn't thread-safe
+                self._client = boto3.session.Session().client(
+                    "s3",
+                    endpoint_url=self.endpoint_url,
+                    region_name=self.region,
+                    aws_access_key_id=self.access_key_id,
+                    aws_secret_access_key=self.secret_access_key,
+                    # Enough connections for every part of a parallel transfer
+                    config=Config(max_pool_connections=max(10, 2 * self.concurrency)),
+                )
+            return self._client
+
+
+def _is_not_found(error: Exception) -> bool:
+    response = getattr(error, "response", None) or {}
+    return str(response.get("Error", {}).get("Code")) in _NOT_FOUND_CODES
+
+
+def _report_prefetch(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Storage prefetch failed: {task.exception()}")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the API process.
+
+Imports `api.main` in fresh interpreters under `python -X importtime`, reports
+the slowest modules and exits non-zero when the best cumulative import time
+exceeds the budget, or when a dependency that must load lazily (the OpenAI
+SDK, NumPy, boto3) is imported at startup. Run from the repository root:
+
+    python benchmarks/import_time.py --budget-ms 1200 --runs 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Loaded on first use only; importing any of these at startup is a regression
+LAZY_MODULES = ("openai", "numpy", "boto3")
+
+# Cumulative import time of api.main, best of several cold imports
+BUDGET_MS = 1200.0
+
+PROBE = (
+    "import sys, {module}; "
+    "print(','.join(m for m in {lazy!r} if m in sys.modules))"
+)
+
+
+def measure(module: str) -> tuple[float, dict, list]:
+    """Import `module` in a fresh interpreter. Returns (total_ms, per-module ms, lazy modules loaded)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us) / 1000.0
+
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return cumulative.get(module, 0.0), cumulative, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="api.main")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="Best of N cold imports")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(max(1, args.runs))]
+    total_ms, cumulative, loaded = min(runs, key=lambda run: run[0])
+
+    print(f"{args.module}: {total_ms:.0f} ms (best of {len(runs)}, budget {args.budget_ms:.0f} ms)")
+    print("slowest top-level imports:")
+    top_level = {name: ms for name, ms in cumulative.items() if "." not in name and name != args.module}
+    for name, ms in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: imported at startup but must load lazily: {', '.join(loaded)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Concurrent playback streaming benchmark.
+
+Opens N concurrent connections to a running EchoFind API and downloads the
+same file repeatedly, reporting aggregate bandwidth. Run the server first
+(`python run.py`), upload a file, then:
+
+    python benchmarks/stream_bandwidth.py <file_id> --concurrency 32 --seconds 10
+"""
+import argparse
+import asyncio
+import time
+
+
+async def fetch_once(host: str, port: int, path: str, range_header: str | None) -> int:
+    """Issue a single GET and return the number of body bytes received."""
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n"
+    if range_header:
+        request += f"Range: {range_header}\r\n"
+    writer.write((request + "\r\n").encode("latin-1"))
+    await writer.drain()
+
+    await reader.readuntil(b"\r\n\r\n")
+    received = 0
+    while True:
+        chunk = await reader.read(1024 * 1024)
+        if not chunk:
+            break
+        received += len(chunk)
+
+    writer.close()
+    await writer.wait_closed()
+    return received
+
+
+async def worker(args, deadline: float, totals: list) -> None:
+    path = f"/api/v1/playback/{args.file_id}{args.suffix}"
+    while time.perf_counter() < deadline:
+        totals.append(await fetch_once(args.host, args.port, path, args.range))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("file_id")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--range", default=None, help='e.g. "bytes=0-1048575"')
+    parser.add_argument("--suffix", default="", help='e.g. "/file" for original media')
+    args = parser.parse_args()
+
+    totals: list[int] = []
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    await asyncio.gather(*(worker(args, deadline, totals) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total_bytes = sum(totals)
+    print(f"requests:   {len(totals)}")
+    print(f"bytes:      {total_bytes}")
+    print(f"elapsed:    {elapsed:.2f}s")
+    print(f"bandwidth:  {total_bytes / elapsed / (1024 * 1024):.1f} MiB/s")
+    print(f"per stream: {total_bytes / elapsed / args.concurrency / (1024 * 1024):.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
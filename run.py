@@ -1,14 +1,23 @@
 #!/usr/bin/env python3
 """
 EchoFind API Server Runner
+
+With API_WORKERS=1 (the default) this starts a single uvicorn process, with
+auto-reload when DEBUG is on. With API_WORKERS>1 it starts the multi-process
+production mode in api.serving.
 """
 import uvicorn
 from api.config import settings
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "api.main:app",
-        host=settings.api_host,
-        port=settings.api_port,
-        reload=settings.debug
-    )
+    if settings.api_workers > 1:
+        from api.serving import run_workers
+        run_workers()
+    else:
+        uvicorn.run(
+            "api.main:app",
+            host=settings.api_host,
+            port=settings.api_port,
+            reload=settings.debug,
+            timeout_graceful_shutdown=settings.graceful_timeout
+        )
@@ -4,9 +4,19 @@ Database setup script for EchoFind API
 """
 import os
 import sys
-from sqlalchemy import create_engine
-from api.db.database import Base, engine
+from sqlalchemy import create_engine, inspect, or_
+from sqlalchemy.orm import Session
+from api.db.database import Base, Transcript, engine
 from api.config import settings
+from api.search.analysis import STORED_OFFSETS_PREFIX, encode_term_offsets
+from api.search.timings import align_word_timings, encode_word_timings
+
+# Columns added to existing tables since their first release. create_all only
+# creates missing tables, so databases set up earlier get these by ALTER TABLE.
+ADDED_COLUMNS = {
+    "audio_files": ["sample_rate", "channels", "bitrate"],
+    "transcripts": ["term_offsets", "word_timings"],
+}
 
 def create_database():
     """Create the database and tables."""
@@ -19,6 +29,62 @@ def create_database():
         print(f"❌ Error creating database tables: {e}")
         return False
 
+def upgrade_database():
+    """Add columns and indexes that tables created by an older version lack."""
+    try:
+        inspector = inspect(engine)
+        with engine.begin() as conn:
+            for table_name, column_names in ADDED_COLUMNS.items():
+                table = Base.metadata.tables[table_name]
+                existing = {column["name"] for column in inspector.get_columns(table_name)}
+                for name in column_names:
+                    if name in existing:
+                        continue
+                    column_type = table.columns[name].type.compile(dialect=engine.dialect)
+                    print(f"Adding column {table_name}.{name}...")
+                    conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}")
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    # No-op for indexes that already exist
+                    index.create(bind=conn, checkfirst=True)
+        print("✅ Database schema is up to date!")
+        return True
+    except Exception as e:
+        print(f"❌ Error upgrading database schema: {e}")
+        return False
+
+def backfill_transcripts(batch_size: int = 500):
+    """Store token positions and word timings on segments written before they were recorded."""
+    try:
+        stale = or_(
+            Transcript.term_offsets.is_(None),
+            ~Transcript.term_offsets.startswith(STORED_OFFSETS_PREFIX, autoescape=True),
+            Transcript.word_timings.is_(None),
+        )
+        updated, last_id = 0, 0
+        with Session(engine) as db:
+            while True:
+                rows = db.query(Transcript).filter(stale, Transcript.id > last_id).order_by(
+                    Transcript.id
+                ).limit(batch_size).all()
+                if not rows:
+                    break
+                for row in rows:
+                    row.term_offsets = encode_term_offsets(row.text)
+                    if row.word_timings is None:
+                        # No word timestamps: interpolated across the segment
+                        timings = align_word_timings(row.text, row.start_time, row.end_time)
+                        row.word_timings = encode_word_timings(*timings, row.start_time)
+                db.commit()
+                updated += len(rows)
+                last_id = rows[-1].id
+        if updated:
+            print(f"Backfilled search data for {updated} transcript segments")
+        return True
+    except Exception as e:
+        print(f"❌ Error backfilling transcript search data: {e}")
+        return False
+
 def check_database_connection():
     """Check if database connection is working."""
     try:
@@ -45,8 +111,8 @@ def main():
         print("4. Run this script again")
         sys.exit(1)
     
-    # Create tables
-    if create_database():
+    # Create tables, then bring tables from earlier versions up to date
+    if create_database() and upgrade_database() and backfill_transcripts():
         print("\n🎉 Setup completed successfully!")
         print("\nNext steps:")
         print("1. Set your OPENAI_API_KEY in .env file")
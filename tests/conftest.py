@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# Settings and the database engine are built at import, so point them at a
+# throwaway SQLite database and storage directory before anything imports api
+_workdir = tempfile.mkdtemp(prefix="audio-api-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ["LOCAL_STORAGE_PATH"] = os.path.join(_workdir, "storage")
+os.environ["STORAGE_TYPE"] = "local"
+# No transcription calls, and keep the background index sync from issuing queries mid-test
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["SEARCH_INDEX_REFRESH_SECONDS"] = "3600"
+os.makedirs(os.environ["LOCAL_STORAGE_PATH"], exist_ok=True)
@@ -0,0 +1,21 @@
+"""The API must import within budget, leaving heavy optional dependencies for first use."""
+import importlib.util
+import os
+
+BENCHMARK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "import_time.py")
+
+
+def _load_benchmark():
+    spec = importlib.util.spec_from_file_location("import_time", BENCHMARK_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_api_import_time_within_budget():
+    import_time = _load_benchmark()
+    # Best of three, as the benchmark does, to ride out a cold disk cache
+    total_ms, _, loaded = min((import_time.measure("api.main") for _ in range(3)), key=lambda run: run[0])
+
+    assert loaded == [], f"imported at startup but must load lazily: {', '.join(loaded)}"
+    assert total_ms <= import_time.BUDGET_MS, f"api.main imports in {total_ms:.0f} ms"
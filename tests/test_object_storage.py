@@ -0,0 +1,121 @@
+"""ObjectStorage against moto's in-process S3 server."""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+pytest.importorskip("boto3")
+moto_server = pytest.importorskip("moto.server")
+
+from api.storage.cache import DiskCache
+from api.storage.object_store import ObjectStorage
+
+BUCKET = "media"
+PART_SIZE = 5 * 1024 * 1024  # S3's minimum multipart part size
+CREDENTIALS = {"region": "us-east-1", "access_key_id": "test", "secret_access_key": "test"}
+
+
+@pytest.fixture(scope="module")
+def endpoint_url():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def storage(endpoint_url, tmp_path):
+    # A bucket per test, so listings and cache state don't leak between them
+    bucket = f"{BUCKET}-{uuid.uuid4().hex}"
+    storage = ObjectStorage(
+        bucket,
+        DiskCache(str(tmp_path / ".cache"), 64 * 1024 * 1024),
+        str(tmp_path / ".staging"),
+        endpoint_url=endpoint_url,
+        part_size=PART_SIZE,
+        concurrency=4,
+        **CREDENTIALS,
+    )
+    storage._get_client().create_bucket(Bucket=bucket)
+    return storage
+
+
+def _put(storage: ObjectStorage, key: str, data: bytes) -> str:
+    path = storage.staging_path(key)
+    with open(path, "wb") as f:
+        f.write(data)
+    return asyncio.run(storage.put_file(key, path))
+
+
+def test_put_file_uploads_in_parts_and_caches(storage):
+    data = os.urandom(2 * PART_SIZE + 1234)
+    staged = storage.staging_path("a.wav")
+
+    cached = _put(storage, "a.wav", data)
+
+    assert not os.path.exists(staged)
+    assert cached == storage.cache.path("a.wav")
+    with open(cached, "rb") as f:
+        assert f.read() == data
+    head = storage._get_client().head_object(Bucket=storage.bucket, Key="a.wav")
+    assert head["ContentLength"] == len(data)
+    # Multipart ETags end in the part count
+    assert head["ETag"].strip('"').endswith("-3")
+
+
+def test_ranged_read_on_cache_miss(storage):
+    data = os.urandom(300_000)
+    _put(storage, "a.wav", data)
+    storage.cache.discard("a.wav")
+
+    async def read():
+        chunks = [chunk async for chunk in storage.iter_range("a.wav", 1000, 100_000, chunk_size=16_384)]
+        whole = await storage.get_range("a.wav", 250_000, 100_000)
+        return chunks, whole
+
+    chunks, whole = asyncio.run(read())
+
+    assert b"".join(chunks) == data[1000:101_000]
+    assert all(len(chunk) <= 16_384 for chunk in chunks)
+    assert whole == data[250_000:]
+    # Ranged reads never pull the whole object into the cache
+    assert storage.cache.get("a.wav") is None
+
+
+def test_fetch_downloads_once_into_cache(storage, monkeypatch):
+    data = os.urandom(PART_SIZE + 4321)
+    _put(storage, "a.wav", data)
+    storage.cache.discard("a.wav")
+
+    downloads = []
+    download = storage._download
+    monkeypatch.setattr(storage, "_download", lambda key: downloads.append(key) or download(key))
+
+    async def fetch_concurrently():
+        return await asyncio.gather(*(storage.fetch("a.wav") for _ in range(4)))
+
+    paths = asyncio.run(fetch_concurrently())
+
+    assert downloads == ["a.wav"]
+    assert set(paths) == {storage.cache.path("a.wav")}
+    with open(paths[0], "rb") as f:
+        assert f.read() == data
+    assert os.listdir(storage.staging_dir) == []
+
+
+def test_cache_evicts_least_recently_used(storage):
+    storage.cache.max_bytes = 2 * 1000
+    _put(storage, "a.wav", b"a" * 1000)
+    _put(storage, "b.wav", b"b" * 1000)
+    assert storage.cache.get("a.wav") is not None  # a is now more recent than b
+
+    _put(storage, "c.wav", b"c" * 1000)
+
+    assert storage.cache.get("b.wav") is None
+    assert storage.cache.get("a.wav") is not None
+    assert storage.cache.get("c.wav") is not None
+    assert storage.describe()["cache"]["entries"] == 2
+    # Evicted objects are still in the bucket
+    assert asyncio.run(storage.get_bytes("b.wav")) == b"b" * 1000
@@ -0,0 +1,141 @@
+"""Phrase and proximity queries, and the word-accurate match times they produce."""
+from datetime import datetime
+
+import pytest
+
+from api.db.database import AudioFile, Transcript
+from api.search.analysis import encode_term_offsets, tokenize
+from api.search.positional import PhraseQuery, PositionalIndex, _exact_match, _proximity_match, parse_phrase_query
+from api.search.store import IndexStore
+from api.search.timings import encode_word_timings
+from api.services.database_service import _to_search_result
+
+TEXT = "So, the budget review is next week. Budget numbers first, then the review."
+SEGMENT_START = 10.0
+
+
+@pytest.mark.parametrize("query, expected", [
+    ('"budget review"', PhraseQuery(["budget", "review"], 0)),
+    ('  "Budget, Review!"  ', PhraseQuery(["budget", "review"], 0)),
+    ('"budget review"~3', PhraseQuery(["budget", "review"], 3)),
+    ('"budget review" ~ 2', PhraseQuery(["budget", "review"], 2)),
+    ('"don\'t stop"', PhraseQuery(["don't", "stop"], 0)),
+    ('"review"', PhraseQuery(["review"], 0)),
+])
+def test_parse_phrase_query(query, expected):
+    assert parse_phrase_query(query) == expected
+
+
+@pytest.mark.parametrize("query", ["budget review", '"budget review', '"budget" review', '"?!"', '""', '"a"~x'])
+def test_parse_phrase_query_rejects_other_queries(query):
+    assert parse_phrase_query(query) is None
+
+
+def test_exact_match_finds_first_consecutive_run():
+    # "budget" at 2 and 10, "review" at 3 and 7
+    assert _exact_match([[2, 10], [3, 7]]) == (2, 3)
+    assert _exact_match([[10, 12], [3, 13]]) == (12, 13)
+    assert _exact_match([[1], [2], [3]]) == (1, 3)
+
+
+def test_exact_match_requires_order_and_adjacency():
+    assert _exact_match([[5], [4]]) is None
+    assert _exact_match([[2], [4]]) is None
+    assert _exact_match([[1], [2], [4]]) is None
+
+
+def test_exact_match_repeated_term():
+    # "the the": the same positions on both sides
+    assert _exact_match([[0, 3, 4], [0, 3, 4]]) == (3, 4)
+
+
+def test_proximity_match_finds_smallest_window_in_any_order():
+    assert _proximity_match([[1, 9], [6, 14]], max_span=5) == (6, 9)
+    assert _proximity_match([[8], [5]], max_span=3) == (5, 8)
+    assert _proximity_match([[0, 18], [10], [5, 13]], max_span=10) == (10, 18)
+
+
+def test_proximity_match_respects_max_span():
+    assert _proximity_match([[0], [4]], max_span=4) == (0, 4)
+    assert _proximity_match([[0], [5]], max_span=4) is None
+
+
+def _word_times(text: str):
+    # Each token i is spoken at SEGMENT_START + i seconds and lasts half a second
+    count = len(list(tokenize(text)))
+    starts = [SEGMENT_START + i for i in range(count)]
+    return starts, [start + 0.5 for start in starts]
+
+
+def _row(text: str = TEXT, term_offsets=None):
+    starts, ends = _word_times(text)
+    transcript = Transcript(
+        id=1, file_id="file-a", segment_index=0, start_time=SEGMENT_START, end_time=SEGMENT_START + 20,
+        text=text, confidence_score=0.9,
+        term_offsets=encode_term_offsets(text) if term_offsets is None else term_offsets,
+        word_timings=encode_word_timings(starts, ends, SEGMENT_START),
+    )
+    audio_file = AudioFile(id="file-a", filename="a.wav", upload_time=datetime(2024, 1, 1))
+    return transcript, audio_file
+
+
+def _forbid_tokenizing(monkeypatch):
+    """Fail if anything from here on re-tokenizes the stored text."""
+    def tokenize(*args, **kwargs):
+        raise AssertionError("stored text was re-tokenized")
+
+    monkeypatch.setattr("api.search.analysis.tokenize", tokenize)
+    monkeypatch.setattr("api.search.timings.tokenize", tokenize)
+
+
+@pytest.mark.parametrize("query, times", [
+    # Tokens: so(0) the(1) budget(2) review(3) is(4) next(5) week(6) budget(7) numbers(8) first(9) then(10) the(11) review(12)
+    ('"budget review"', (12.0, 13.5)),
+    ('"next week"', (15.0, 16.5)),
+    ('"numbers review"~3', (18.0, 22.5)),
+    ('"review budget"~2', (12.0, 13.5)),
+])
+def test_phrase_match_times(tmp_path, query, times):
+    transcript, audio_file = _row()
+    store = IndexStore(str(tmp_path))
+    store.append([(transcript.id, transcript.file_id, [term for term, _, _ in tokenize(TEXT)])])
+    store.refresh()
+    phrase = parse_phrase_query(query)
+    [hit] = PositionalIndex([store]).search(phrase)
+
+    result = _to_search_result(transcript, audio_file, phrase.terms, 0, (hit.first_position, hit.last_position))
+
+    assert (result.match_start_time, result.match_end_time) == times
+
+
+@pytest.mark.parametrize("snippet_chars", [0, 30])
+def test_plain_query_match_time_comes_from_the_first_highlight(monkeypatch, snippet_chars):
+    transcript, audio_file = _row()
+    _forbid_tokenizing(monkeypatch)
+
+    result = _to_search_result(transcript, audio_file, ["numbers"], snippet_chars)
+
+    assert "numbers" in result.transcript_segment
+    # "numbers" is token 8
+    assert (result.match_start_time, result.match_end_time) == (18.0, 18.5)
+
+
+def test_match_times_do_not_retokenize_text(monkeypatch):
+    transcript, audio_file = _row()
+    _forbid_tokenizing(monkeypatch)
+
+    result = _to_search_result(transcript, audio_file, ["budget", "review"], 0, (2, 3))
+
+    assert (result.match_start_time, result.match_end_time) == (12.0, 13.5)
+    assert len(result.highlights) == 4
+
+
+def test_offsets_stored_without_positions_still_highlight(monkeypatch):
+    # [start, length] pairs, as stored before token positions were recorded
+    transcript, audio_file = _row(term_offsets='{"budget":[8,6,36,6]}')
+    _forbid_tokenizing(monkeypatch)
+
+    result = _to_search_result(transcript, audio_file, ["budget"], 0)
+
+    assert result.highlights == [[8, 14], [36, 42]]
+    assert result.match_start_time is None and result.match_end_time is None
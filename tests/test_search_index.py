@@ -0,0 +1,186 @@
+"""The on-disk positional index: segment files, appends, tombstones, merges and restarts."""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from api.processing import executor
+from api.search.positional import PhraseQuery, PositionalIndex
+from api.search.segments import IndexSegment, merge_segments, write_segment
+from api.search.store import IndexStore
+from api.services.database_service import DatabaseService
+from api.services.index_service import IndexService
+
+DOCS = [
+    (1, "file-a", ["the", "budget", "review", "is", "next", "week"]),
+    (2, "file-a", ["budget", "numbers", "look", "good"]),
+    (3, "file-b", ["review", "the", "budget", "review"]),
+    (4, "file-c", ["team", "meeting", "about", "the", "budget", "review"]),
+]
+BUDGET_REVIEW = PhraseQuery(["budget", "review"], 0)
+
+
+def _search(store: IndexStore, query: PhraseQuery = BUDGET_REVIEW):
+    return PositionalIndex([store]).search(query)
+
+
+def _merge(store: IndexStore) -> None:
+    with store.merging() as plan:
+        assert plan is not None
+        merged = merge_segments(
+            [os.path.join(store.index_dir, name) for name in plan.inputs],
+            plan.deleted_file_ids,
+            os.path.join(store.index_dir, plan.output),
+        )
+        store.commit_merge(plan, merged)
+
+
+def test_segment_round_trip(tmp_path):
+    path = str(tmp_path / "seg.eidx")
+    # Written in any order; stored by doc ID
+    assert write_segment(path, reversed(DOCS)) == len(DOCS)
+
+    segment = IndexSegment(path)
+    try:
+        assert segment.doc_count == 4
+        assert segment.file_ids == ["file-a", "file-b", "file-c"]
+        assert {doc_id: list(positions) for doc_id, positions in segment.postings("review").items()} == {
+            1: [2], 3: [0, 3], 4: [5]
+        }
+        assert segment.postings("missing") is None
+        assert [segment.file_of(doc_id) for doc_id in (1, 2, 3, 4, 5)] == ["file-a", "file-a", "file-b", "file-c", None]
+        assert dict(segment.term_dfs())["budget"] == 4
+        assert dict(segment.phrase_dfs())["budget review"] == 3
+        assert sorted(segment.docs()) == sorted(DOCS)
+        assert sorted(segment.docs({"file-a"})) == sorted(DOCS[2:])
+    finally:
+        segment.close()
+
+
+def test_append_writes_delta_segments_and_skips_indexed_files(tmp_path):
+    store = IndexStore(str(tmp_path))
+    assert store.append(DOCS[:2]) is not None
+    assert store.append(DOCS[2:]) is not None
+    # file-a is already indexed
+    assert store.append([(9, "file-a", ["budget", "review"])]) is None
+
+    store.refresh()
+    assert len(store.segments) == 2
+    assert store.file_ids == {"file-a", "file-b", "file-c"}
+    assert [hit.segment_id for hit in _search(store)] == [1, 3, 4]
+
+
+def test_tombstone_hides_file_and_merge_drops_it(tmp_path):
+    store = IndexStore(str(tmp_path))
+    store.append(DOCS[:2])
+    store.append(DOCS[2:])
+    store.refresh()
+
+    store.delete_files(["file-b"])
+    store.refresh()
+    assert store.deleted_file_ids == {"file-b"}
+    assert store.file_ids == {"file-a", "file-c"}
+    assert [hit.segment_id for hit in _search(store)] == [1, 4]
+
+    before = set(store.segments)
+    _merge(store)
+    store.refresh()
+    # Only the segment holding file-b is rewritten, and the tombstone is applied
+    assert store.deleted_file_ids == set()
+    assert len(store.segments) == 2 and len(set(store.segments) - before) == 1
+    assert not any("file-b" in segment.file_ids for segment in store.segments.values())
+    assert [hit.segment_id for hit in _search(store)] == [1, 4]
+
+
+def test_warm_restart_maps_the_existing_segments(tmp_path):
+    store = IndexStore(str(tmp_path))
+    store.append(DOCS[:2])
+    store.append(DOCS[2:])
+    store.delete_files(["file-c"])
+    store.refresh()
+    files = sorted(os.listdir(tmp_path))
+
+    restarted = IndexStore(str(tmp_path))
+    assert restarted.refresh()
+
+    assert set(restarted.segments) == set(store.segments)
+    assert restarted.deleted_file_ids == {"file-c"}
+    assert _search(restarted) == _search(store)
+    # Nothing was rebuilt or rewritten
+    assert sorted(os.listdir(tmp_path)) == files
+    assert not restarted.refresh()
+
+
+@pytest.fixture
+def index_service(tmp_path, monkeypatch):
+    service = IndexService()
+    store = IndexStore(str(tmp_path))
+    service.stores = [store]
+    texts = [(doc_id, file_id, " ".join(tokens)) for doc_id, file_id, tokens in DOCS]
+
+    async def get_segment_texts(file_ids, db=None):
+        return [row for row in texts if row[1] in set(file_ids)]
+
+    monkeypatch.setattr(service.db_service, "get_segment_texts", get_segment_texts)
+    yield service, store
+    executor.shutdown_executor()
+
+
+def _transcribed(service, monkeypatch, file_ids):
+    async def get_transcribed_file_ids(db=None):
+        return file_ids
+
+    monkeypatch.setattr(service.db_service, "get_transcribed_file_ids", get_transcribed_file_ids)
+
+
+def test_sync_appends_files_missing_from_the_index(index_service, monkeypatch):
+    service, store = index_service
+    _transcribed(service, monkeypatch, {"file-a", "file-b", "file-c"})
+
+    asyncio.run(service.sync())
+
+    assert store.file_ids == {"file-a", "file-b", "file-c"}
+    assert [hit.segment_id for hit in _search(store)] == [1, 3, 4]
+
+
+def test_failed_file_lookup_is_not_an_empty_result():
+    # A database without the tables fails every query
+    with Session(bind=create_engine("sqlite://")) as db:
+        assert asyncio.run(DatabaseService().get_transcribed_file_ids(db=db)) is None
+
+
+def test_sync_leaves_the_index_alone_when_the_lookup_fails(index_service, monkeypatch):
+    service, store = index_service
+    _transcribed(service, monkeypatch, {"file-a", "file-b", "file-c"})
+    asyncio.run(service.sync())
+    segments = set(store.segments)
+
+    _transcribed(service, monkeypatch, None)
+    asyncio.run(service.sync())
+
+    assert store.deleted_file_ids == set()
+    assert set(store.segments) == segments
+    assert [hit.segment_id for hit in _search(store)] == [1, 3, 4]
+
+
+def test_remove_file_tombstones_and_sync_merges_it_out(index_service, monkeypatch):
+    service, store = index_service
+    _transcribed(service, monkeypatch, {"file-a", "file-b", "file-c"})
+    asyncio.run(service.sync())
+    segments = set(store.segments)
+
+    asyncio.run(service.remove_file("file-b"))
+
+    # Hidden at once, without rewriting any segment
+    assert store.deleted_file_ids == {"file-b"}
+    assert set(store.segments) == segments
+    assert [hit.segment_id for hit in _search(store)] == [1, 4]
+
+    _transcribed(service, monkeypatch, {"file-a", "file-c"})
+    asyncio.run(service.sync())
+
+    assert store.deleted_file_ids == set()
+    assert not any("file-b" in segment.file_ids for segment in store.segments.values())
+    assert [hit.segment_id for hit in _search(store)] == [1, 4]
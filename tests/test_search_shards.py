@@ -0,0 +1,125 @@
+"""Sharded phrase search agrees with a single index, and readers survive concurrent merges."""
+import asyncio
+import os
+import random
+
+import pytest
+
+from api.search.positional import PhraseQuery, PositionalIndex
+from api.search.segments import merge_segments
+from api.search.shards import ShardPool
+from api.search.store import IndexStore, shard_of
+
+SHARDS = 3
+VOCABULARY = ["budget", "review", "meeting", "quarter", "sales", "plan", "team", "report", "next", "week"]
+QUERIES = [
+    PhraseQuery(["budget", "review"], 0),
+    PhraseQuery(["sales", "report", "next"], 0),
+    PhraseQuery(["team", "plan"], 2),
+    PhraseQuery(["quarter", "meeting", "week"], 4),
+    PhraseQuery(["review"], 0),
+]
+
+
+def _corpus(files: int = 40, segments_per_file: int = 5, seed: int = 7):
+    rng = random.Random(seed)
+    docs, doc_id = [], 1
+    for file_number in range(files):
+        file_id = f"file-{file_number:03d}"
+        for _ in range(segments_per_file):
+            docs.append((doc_id, file_id, rng.choices(VOCABULARY, k=rng.randint(5, 30))))
+            doc_id += 1
+    return docs
+
+
+def _append_in_batches(store: IndexStore, docs, batches: int = 3):
+    # Several delta segments per store, as incremental ingestion leaves them.
+    # Whole files per batch: append skips files that are already indexed.
+    file_ids = sorted({file_id for _, file_id, _ in docs})
+    for i in range(batches):
+        batch = set(file_ids[i::batches])
+        store.append([doc for doc in docs if doc[1] in batch])
+
+
+@pytest.fixture
+def indexes(tmp_path):
+    docs = _corpus()
+    single = IndexStore(str(tmp_path / "single"))
+    _append_in_batches(single, docs)
+
+    shard_dirs = [str(tmp_path / "sharded" / f"shard-{shard:02d}") for shard in range(SHARDS)]
+    shards = [IndexStore(shard_dir) for shard_dir in shard_dirs]
+    for shard, store in enumerate(shards):
+        _append_in_batches(store, [doc for doc in docs if shard_of(doc[1], SHARDS) == shard])
+    return single, shards, shard_dirs
+
+
+def _search_shards(shard_dirs, queries, limit):
+    async def run():
+        pool = ShardPool(shard_dirs, timeout=60)
+        try:
+            await pool.start()
+            return [await pool.search(query, limit) for query in queries]
+        finally:
+            pool.shutdown()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("limit", [5, 1000])
+def test_sharded_search_matches_single_index(indexes, limit):
+    single, shards, shard_dirs = indexes
+    single.refresh()
+    expected = [PositionalIndex([single]).search(query, limit) for query in QUERIES]
+    assert any(expected), "the corpus should match some queries"
+
+    assert _search_shards(shard_dirs, QUERIES, limit) == expected
+
+
+def test_sharded_search_matches_single_index_after_deletes(indexes):
+    single, shards, shard_dirs = indexes
+    deleted = [f"file-{file_number:03d}" for file_number in range(0, 40, 3)]
+    single.delete_files(deleted)
+    for shard, store in enumerate(shards):
+        store.delete_files([file_id for file_id in deleted if shard_of(file_id, SHARDS) == shard])
+    single.refresh()
+    expected = [PositionalIndex([single]).search(query, 20) for query in QUERIES]
+
+    assert _search_shards(shard_dirs, QUERIES, 20) == expected
+
+
+def _merge(store: IndexStore) -> None:
+    with store.merging() as plan:
+        assert plan is not None
+        merged = merge_segments(
+            [os.path.join(store.index_dir, name) for name in plan.inputs],
+            plan.deleted_file_ids,
+            os.path.join(store.index_dir, plan.output),
+        )
+        store.commit_merge(plan, merged)
+
+
+def test_refresh_survives_merge_between_manifest_read_and_mmap(tmp_path):
+    index_dir = str(tmp_path / "index")
+    writer = IndexStore(index_dir, max_segments=1)
+    _append_in_batches(writer, _corpus())
+    writer.refresh()
+    expected = [PositionalIndex([writer]).search(query) for query in QUERIES]
+
+    reader = IndexStore(index_dir)
+    read_manifest = reader._read_manifest
+    raced = []
+
+    def read_then_merge():
+        manifest = read_manifest()
+        if not raced:
+            # Another process merges and unlinks the segments this manifest lists
+            raced.append(True)
+            _merge(writer)
+        return manifest
+
+    reader._read_manifest = read_then_merge
+    assert reader.refresh()
+
+    assert raced
+    assert len(reader.segments) == 1
+    assert [PositionalIndex([reader]).search(query) for query in QUERIES] == expected
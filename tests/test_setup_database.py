@@ -0,0 +1,98 @@
+"""setup_database.py brings tables created by earlier versions up to the current schema."""
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+import setup_database
+from api.db.database import Base
+from api.search.analysis import STORED_OFFSETS_PREFIX, decode_term_offsets
+from api.search.timings import decode_word_timings
+
+# The schema as first released, before media properties, term offsets and word timings
+ORIGINAL_SCHEMA = """
+CREATE TABLE audio_files (
+    id VARCHAR PRIMARY KEY, filename VARCHAR NOT NULL, file_size INTEGER NOT NULL, duration FLOAT,
+    format VARCHAR NOT NULL, upload_time DATETIME, transcription_status VARCHAR, file_path VARCHAR NOT NULL
+);
+CREATE INDEX ix_audio_files_id ON audio_files (id);
+CREATE TABLE transcripts (
+    id INTEGER PRIMARY KEY, file_id VARCHAR NOT NULL, segment_index INTEGER NOT NULL,
+    start_time FLOAT NOT NULL, end_time FLOAT NOT NULL, text TEXT NOT NULL,
+    confidence_score FLOAT, created_at DATETIME
+);
+CREATE INDEX ix_transcripts_id ON transcripts (id);
+CREATE INDEX ix_transcripts_file_id ON transcripts (file_id);
+INSERT INTO audio_files VALUES ('f1', 'a.wav', 10, 1.0, 'wav', NULL, 'completed', './uploads/f1.wav');
+"""
+
+
+@pytest.fixture
+def old_engine(tmp_path, monkeypatch):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(ORIGINAL_SCHEMA)
+    engine = create_engine(f"sqlite:///{path}")
+    monkeypatch.setattr(setup_database, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_adds_missing_columns_and_indexes(old_engine):
+    assert setup_database.create_database()
+    assert setup_database.upgrade_database()
+
+    inspector = inspect(old_engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert columns == set(table.columns.keys())
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= indexes
+    with old_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT id, sample_rate FROM audio_files").all() == [("f1", None)]
+
+
+def test_upgrade_is_idempotent(old_engine):
+    assert setup_database.upgrade_database()
+    assert setup_database.upgrade_database()
+
+
+def test_backfill_stores_positions_and_timings(old_engine):
+    assert setup_database.upgrade_database()
+    with old_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO transcripts (id, file_id, segment_index, start_time, end_time, text, term_offsets) "
+            "VALUES (1, 'f1', 0, 4.0, 6.0, 'budget review', '{\"budget\":[0,6],\"review\":[7,6]}')"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO transcripts (id, file_id, segment_index, start_time, end_time, text) "
+            "VALUES (2, 'f1', 1, 6.0, 8.0, 'next week')"
+        )
+
+    assert setup_database.backfill_transcripts(batch_size=1)
+
+    with old_engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT term_offsets, word_timings, start_time FROM transcripts ORDER BY id"
+        ).all()
+    first, second = rows
+    assert all(row.term_offsets.startswith(STORED_OFFSETS_PREFIX) for row in rows)
+    assert decode_term_offsets(first.term_offsets) == {"budget": [0, 6, 0], "review": [7, 6, 1]}
+    assert decode_term_offsets(second.term_offsets) == {"next": [0, 4, 0], "week": [5, 4, 1]}
+    starts, ends = decode_word_timings(first.word_timings, first.start_time)
+    assert len(starts) == len(ends) == 2
+    assert starts[0] == pytest.approx(4.0) and ends[-1] == pytest.approx(6.0, abs=0.01)
+
+
+def test_backfill_skips_rows_already_in_the_current_format(old_engine, capsys):
+    assert setup_database.upgrade_database()
+    with old_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO transcripts (id, file_id, segment_index, start_time, end_time, text) "
+            "VALUES (1, 'f1', 0, 0.0, 1.0, 'budget review')"
+        )
+    assert setup_database.backfill_transcripts()
+    assert "for 1 transcript segments" in capsys.readouterr().out
+
+    assert setup_database.backfill_transcripts()
+    assert "Backfilled" not in capsys.readouterr().out
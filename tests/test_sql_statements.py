@@ -0,0 +1,147 @@
+"""Each endpoint should cost a fixed number of SQL statements, however much data there is."""
+import io
+import threading
+import wave
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from api.db.database import create_tables, engine
+from api.main import app
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+        self.threads = set()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.threads.add(threading.get_ident())
+
+    def reset(self):
+        self.statements.clear()
+        self.threads.clear()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture(scope="module")
+def client():
+    create_tables()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def counter():
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter)
+
+
+def _wav_bytes(seconds: float = 0.5, sample_rate: int = 8000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+def _upload(client) -> str:
+    response = client.post("/api/v1/upload/", files={"file": ("clip.wav", _wav_bytes(), "audio/wav")})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["success"], body
+    return body["file_id"]
+
+
+def _assert_statements(counter, expected: int, request, status_code: int = 200):
+    counter.reset()
+    response = request()
+    assert response.status_code == status_code, response.text
+    assert counter.count == expected, counter.statements
+
+
+def test_upload(client, counter):
+    counter.reset()
+    _upload(client)
+    assert counter.count == 1, counter.statements
+
+
+def test_upload_status(client, counter):
+    file_id = _upload(client)
+    _assert_statements(counter, 1, lambda: client.get(f"/api/v1/upload/status/{file_id}"))
+
+
+def test_info(client, counter):
+    file_id = _upload(client)
+    _assert_statements(counter, 1, lambda: client.get(f"/api/v1/playback/{file_id}/info"))
+
+
+def test_playback(client, counter):
+    file_id = _upload(client)
+    _assert_statements(counter, 1, lambda: client.post("/api/v1/playback/", json={"file_id": file_id}))
+
+
+def test_stream(client, counter):
+    file_id = _upload(client)
+    _assert_statements(counter, 1, lambda: client.get(f"/api/v1/playback/{file_id}"))
+
+
+def test_stream_range(client, counter):
+    # Players issue many of these per play
+    file_id = _upload(client)
+    _assert_statements(
+        counter, 1, lambda: client.get(f"/api/v1/playback/{file_id}", headers={"Range": "bytes=100-199"}), 206
+    )
+
+
+def test_download(client, counter):
+    file_id = _upload(client)
+    _assert_statements(counter, 1, lambda: client.get(f"/api/v1/playback/{file_id}/file"))
+
+
+def test_transcript(client, counter):
+    file_id = _upload(client)
+    _assert_statements(counter, 1, lambda: client.get(f"/api/v1/playback/{file_id}/transcript"))
+
+
+def test_search(client, counter):
+    _upload(client)
+    _assert_statements(counter, 1, lambda: client.get("/api/v1/search/", params={"query": "hello"}))
+
+
+def test_search_batch(client, counter):
+    _upload(client)
+    # A single search queries on the event loop's thread
+    _assert_statements(counter, 1, lambda: client.get("/api/v1/search/", params={"query": "hello"}))
+    loop_threads = set(counter.threads)
+
+    queries = ["hello", "world", '"hello world"', "hello"]
+    counter.reset()
+    response = client.post("/api/v1/search/batch", json={"requests": [{"query": query} for query in queries]})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["success"] and body["unique_queries"] == 3
+    # One per unique query, all on one worker thread
+    assert counter.count == 3, counter.statements
+    assert len(counter.threads) == 1 and not counter.threads & loop_threads
+
+
+def test_list(client, counter):
+    for _ in range(3):
+        _upload(client)
+    _assert_statements(counter, 1, lambda: client.get("/api/v1/admin/files"))
+
+
+def test_delete(client, counter):
+    file_id = _upload(client)
+    # Segments and the file row; the search index tombstones it without a query
+    _assert_statements(counter, 2, lambda: client.delete(f"/api/v1/admin/files/{file_id}"))